@@ -15,9 +15,11 @@ from utils.api_client import USITCApiClient
 from utils.llm_service import LLMService
 # Removed PDF generator import
 from utils.product_analyzer import ProductAnalyzer
+from utils.logging_config import configure_logging
 
 # Load environment variables
 load_dotenv()
+configure_logging()
 
 # Set page configuration
 st.set_page_config(
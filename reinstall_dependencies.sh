@@ -4,7 +4,7 @@ echo "Reinstalling dependencies with compatible versions..."
 echo
 
 echo "Uninstalling existing packages..."
-pip uninstall -y numpy pandas streamlit openai requests reportlab python-dotenv beautifulsoup4
+pip uninstall -y numpy pandas streamlit openai tiktoken requests reportlab python-dotenv beautifulsoup4
 
 echo
 echo "Installing packages with specific versions..."
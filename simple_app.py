@@ -9,6 +9,9 @@ import json
 import streamlit as st
 from utils.api_client import USITCApiClient
 from utils.product_analyzer import ProductAnalyzer
+from utils.logging_config import configure_logging
+
+configure_logging()
 
 # Set page configuration
 st.set_page_config(
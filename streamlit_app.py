@@ -33,6 +33,10 @@ if "pdf_buffer" not in st.session_state:
 # Initialize API client and LLM service
 from utils.api_client import USITCApiClient
 from utils.llm_service import LLMService
+from utils.product_analyzer import ProductAnalyzer
+from utils.logging_config import configure_logging
+
+configure_logging()
 
 # Check for API keys in Streamlit secrets
 api_key = None
@@ -46,9 +50,16 @@ else:
     api_key = os.getenv("OPENAI_API_KEY")
     model = os.getenv("OPENAI_MODEL", "gpt-4")
 
-# Initialize services
-api_client = USITCApiClient(cache_enabled=True)
-llm_service = LLMService(api_key=api_key, model=model, cache_enabled=True)
+# Initialize services once per process, so their caches (including the product
+# analyzer's analysis cache) survive reruns and searches
+@st.cache_resource
+def initialize_services(api_key, model):
+    api_client = USITCApiClient(cache_enabled=True)
+    llm_service = LLMService(api_key=api_key, model=model, cache_enabled=True)
+    product_analyzer = ProductAnalyzer(api_client, llm_service)
+    return api_client, llm_service, product_analyzer
+
+api_client, llm_service, product_analyzer = initialize_services(api_key, model)
 
 # Load sample data for fallback
 @st.cache_data
@@ -156,7 +167,7 @@ if page == "Search":
                         search_terms = llm_service.enhance_search_query(product_description)
                         
                         # Get product analysis from LLM cache
-                        product_analysis = llm_service.cache.get(f"analysis_{product_description}")
+                        product_analysis = llm_service.get_cached_analysis(product_description)
                     else:
                         st.warning("AI analysis not available. Using basic search.")
                         search_terms = [product_description]
@@ -167,12 +178,6 @@ if page == "Search":
                             "HTS_TERMINOLOGY": "Not analyzed"
                         }
                     
-                    # Import the product analyzer
-                    from utils.product_analyzer import ProductAnalyzer
-                    
-                    # Create a product analyzer
-                    product_analyzer = ProductAnalyzer(api_client, llm_service)
-                    
                     # Analyze the product
                     analysis_results = product_analyzer.analyze_product(
                         product_description,
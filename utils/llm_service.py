@@ -6,43 +6,609 @@ and generating explanations of tariff information.
 """
 
 import os
+import re
+import logging
+import time
+import hashlib
+import string
+import threading
+import httpx
 import openai
 import json
-from typing import Dict, List, Any, Optional, Union
+import functools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Any, Literal, Optional, Tuple, Union
 from dotenv import load_dotenv
 
+try:
+    import tiktoken
+except ImportError:  # tiktoken is listed in requirements.txt; without it fall back to a character-based estimate
+    tiktoken = None
+
+try:
+    from diskcache import Cache as DiskCache
+except ImportError:  # diskcache is optional; responses are then cached in memory only
+    DiskCache = None
+
 # Load environment variables from .env file
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Number of products scored per batched confidence request; larger batches are split
+# and sent in parallel since latency grows quickly with the size of a single prompt
+CONFIDENCE_BATCH_SIZE = 8
+
+# JSON Schema for the product analysis returned by enhance_search_query. Models with
+# Structured Outputs support are guaranteed to conform, so no text parsing is needed.
+HTS_ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "MATERIALS": {"type": "array", "items": {"type": "string"}},
+        "FUNCTION": {"type": "string"},
+        "INDUSTRY_TERMS": {"type": "array", "items": {"type": "string"}},
+        "HTS_TERMINOLOGY": {"type": "string"},
+        "HTS_CODES": {"type": "array", "items": {"type": "string"}},
+        "SEARCH_TERMS": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["MATERIALS", "FUNCTION", "INDUSTRY_TERMS", "HTS_TERMINOLOGY", "HTS_CODES", "SEARCH_TERMS"],
+    "additionalProperties": False
+}
+
+# Static instructions for enhance_search_query. They are sent as the system message so
+# only the product description varies between requests, which keeps the per-product
+# user prompt small.
+ENHANCE_SYSTEM_PROMPT = """You are a tariff classification expert with deep knowledge of the Harmonized Tariff Schedule (HTS).
+
+IMPORTANT CONTEXT ABOUT HTS:
+- The HTS is not a list of specific products but a hierarchical classification system
+- Products are categorized based primarily on material composition and function
+- The HTS uses formal terminology that often differs from common commercial terms
+- For example, "phone chargers" are listed as "static converters for telecommunication devices"
+
+TASK:
+Analyze the product description given by the user and identify the appropriate HTS codes and search terms.
+
+Provide the following:
+1. MATERIALS: List the primary materials (e.g., plastic, steel, textile)
+2. FUNCTION: Describe the primary function in formal terms
+3. INDUSTRY_TERMS: Provide industry-specific terminology
+4. HTS_TERMINOLOGY: Convert to formal HTS terminology
+5. HTS_CODES: Provide 3-5 specific HTS codes that would be appropriate for this product. Be as specific as possible, including subheadings (e.g., 8708.10.60 rather than just 8708.10). For automotive parts, consider codes like 8708.10.60 for bumper parts, 8708.29 for body parts, etc.
+6. SEARCH_TERMS: Generate 5-7 specific search terms that would yield accurate HTS codes
+
+IMPORTANT: For HTS_CODES, provide the most specific codes possible, including all available digits and subheadings. For example, use "8708.10.6030" instead of just "8708.10" for automotive bumper parts. The more specific the code, the better the search results will be."""
+
+# Static instructions for generate_tariff_explanation, sent as the system message
+EXPLANATION_SYSTEM_PROMPT = """You are a tariff expert. Explain the tariff information given by the user in plain language.
+
+Provide:
+1. A simple explanation of what this product category includes
+2. An interpretation of the applicable duty rates
+3. Potential trade agreement benefits
+4. Key considerations for importers
+
+Keep your response under 250 words and focus on practical implications."""
+
+# Logit bias applied to the " High", " Medium" and " Low" tokens in confidence scoring.
+# Kept mild so the short free-text reasons are not pushed towards those words too.
+CONFIDENCE_LOGIT_BIAS = 2
+
+# Models that support JSON mode (response_format json_object) but not Structured Outputs
+_JSON_MODELS = frozenset({
+    "gpt-4-turbo",
+    "gpt-4-turbo-2024-04-09",
+    "gpt-4-1106-preview",
+    "gpt-4-0125-preview",
+    "gpt-3.5-turbo-0125",
+    "gpt-3.5-turbo-1106",
+    "gpt-4o-2024-05-13"
+})
+
+# Model families that support Structured Outputs (response_format json_schema)
+_STRUCTURED_OUTPUT_PREFIXES = ("gpt-4o", "gpt-4.1")
+
+# Matches a section header in a text-formatted product analysis, e.g. "2. FUNCTION: ..."
+# or "**Industry Terms:**", capturing the section name and any content after it
+_SECTION_RE = re.compile(
+    r"^[#*\s]*(?:\d+\.\s*)?\**(?P<section>MATERIALS|FUNCTION|INDUSTRY[_ ]TERMS|HTS[_ ]TERMINOLOGY|HTS[_ ]CODES|SEARCH[_ ]TERMS)\**\s*(?::\**\s*(?P<rest>.*))?$",
+    re.IGNORECASE
+)
+
+# Sections of the product analysis that hold lists rather than free text
+_LIST_SECTIONS = frozenset({"MATERIALS", "INDUSTRY_TERMS", "HTS_CODES", "SEARCH_TERMS"})
+
+# Matches a confidence line such as "1. High: matches bumper parts", "2) [Low]: unrelated"
+# or "3. Medium - similar part", capturing the 1-based index, the level and the reason
+_CONF_RE = re.compile(
+    r"^[ \t]*(\d+)[.)][ \t]*\[?(High|Medium|Low)\b\]?[ \t]*[:\-–]?[ \t]*(.*)$",
+    re.IGNORECASE | re.MULTILINE
+)
+
+# Matches batched confidence lines such as "B.3: High: matches plastic fasteners"
+_BATCH_CONFIDENCE_RE = re.compile(
+    r"^[ \t]*([A-Z])\.(\d+)[ \t]*[:.)]?[ \t]*\[?(High|Medium|Low)\]?[ \t]*[:\-–]?[ \t]*(.*)$",
+    re.IGNORECASE | re.MULTILINE
+)
+
+# Cache key prefix for the full product analysis stored by enhance_search_query
+_ANALYSIS_PREFIX = "analysis_"
+
+# Cache key prefix for the details of submitted Batch API jobs
+_BATCH_PREFIX = "batch_"
+
+@functools.lru_cache(maxsize=None)
+def _get_encoding(model: str) -> Any:
+    """
+    Get the tiktoken encoding for a model, loading it at most once.
+    
+    Args:
+        model: OpenAI model name
+        
+    Returns:
+        The encoding, or None if tiktoken is not installed, does not know the model,
+        or cannot download the encoding
+    """
+    if tiktoken is None:
+        logger.warning("tiktoken is not installed; token counts for %s are estimated and no logit bias is sent", model)
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception as e:
+        logger.warning("No tiktoken encoding for %s (%s); token counts are estimated and no logit bias is sent", model, e)
+        return None
+
+@functools.lru_cache(maxsize=None)
+def _confidence_logit_bias(model: str) -> Dict[str, int]:
+    """
+    Build the logit bias favouring the confidence level tokens for a model.
+    
+    Args:
+        model: Model the confidence request will be sent to
+        
+    Returns:
+        Mapping of token ID (as a string) to bias, or an empty dict if the model's
+        encoding is unavailable
+    """
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return {}
+    return {
+        str(encoding.encode(level)[0]): CONFIDENCE_LOGIT_BIAS
+        for level in (" High", " Medium", " Low")
+    }
+
+def _response_format_mode(model: str) -> str:
+    """
+    Determine how a model can be asked for a structured product analysis.
+    
+    Args:
+        model: OpenAI model name, including fine-tuned names such as "ft:gpt-4o-mini:org::id"
+        
+    Returns:
+        "json_schema" for Structured Outputs, "json_object" for JSON mode, or "text"
+    """
+    base_model = model[3:] if model.startswith("ft:") else model
+    base_model = base_model.split(":")[0]
+    if base_model in _JSON_MODELS:
+        return "json_object"
+    if base_model.startswith(_STRUCTURED_OUTPUT_PREFIXES):
+        return "json_schema"
+    return "text"
+
+def _env_limit(name: str) -> Optional[int]:
+    """
+    Read an optional positive integer limit from the environment.
+    
+    Args:
+        name: Environment variable name
+        
+    Returns:
+        The limit, or None (no limit) if the variable is unset, zero or malformed
+    """
+    value = os.getenv(name, "").strip()
+    if not value:
+        return None
+    try:
+        limit = int(value)
+    except ValueError:
+        logger.warning("Ignoring invalid %s value %r; no limit will be applied", name, value)
+        return None
+    return limit if limit > 0 else None
+
+class RateLimiter:
+    """
+    Proactive request/token limiter for OpenAI calls.
+    
+    Follows the leaky-bucket scheme from the OpenAI cookbook's parallel request
+    processor: request and token capacity refill continuously up to the
+    per-minute limits, and a call only proceeds once both buckets can cover it.
+    This avoids spending a round-trip on requests that would be rejected with 429.
+    """
+    
+    def __init__(self, max_rpm: Optional[int] = None, max_tpm: Optional[int] = None, max_concurrent: int = 8):
+        """
+        Initialize the rate limiter.
+        
+        Args:
+            max_rpm: Maximum requests per minute (None for no request limit)
+            max_tpm: Maximum tokens per minute (None for no token limit)
+            max_concurrent: Maximum number of requests in flight at once
+        """
+        self.max_rpm = max_rpm
+        self.max_tpm = max_tpm
+        self.available_request_capacity = float(max_rpm or 0)
+        self.available_token_capacity = float(max_tpm or 0)
+        self.last_update_time = time.monotonic()
+        self._lock = threading.Lock()
+        self._semaphore = threading.BoundedSemaphore(max_concurrent)
+    
+    def _refill(self) -> None:
+        """Refill both buckets based on the time elapsed since the last update."""
+        now = time.monotonic()
+        elapsed = now - self.last_update_time
+        self.last_update_time = now
+        if self.max_rpm:
+            self.available_request_capacity = min(
+                self.available_request_capacity + self.max_rpm * elapsed / 60.0,
+                self.max_rpm
+            )
+        if self.max_tpm:
+            self.available_token_capacity = min(
+                self.available_token_capacity + self.max_tpm * elapsed / 60.0,
+                self.max_tpm
+            )
+    
+    def acquire(self, tokens: int) -> None:
+        """
+        Block until there is capacity for one request consuming the given tokens.
+        
+        Args:
+            tokens: Estimated number of tokens (prompt plus completion) for the request
+        """
+        self._semaphore.acquire()
+        if self.max_tpm:
+            # A single request larger than the bucket could otherwise never proceed
+            tokens = min(tokens, self.max_tpm)
+        
+        while True:
+            with self._lock:
+                self._refill()
+                has_requests = not self.max_rpm or self.available_request_capacity >= 1
+                has_tokens = not self.max_tpm or self.available_token_capacity >= tokens
+                if has_requests and has_tokens:
+                    if self.max_rpm:
+                        self.available_request_capacity -= 1
+                    if self.max_tpm:
+                        self.available_token_capacity -= tokens
+                    return
+                
+                # Sleep roughly until the scarcer bucket has refilled enough
+                wait = 0.0
+                if not has_requests:
+                    wait = max(wait, (1 - self.available_request_capacity) * 60.0 / self.max_rpm)
+                if not has_tokens:
+                    wait = max(wait, (tokens - self.available_token_capacity) * 60.0 / self.max_tpm)
+            time.sleep(min(max(wait, 0.01), 1.0))
+    
+    def release(self) -> None:
+        """Release the concurrency slot taken by acquire()."""
+        self._semaphore.release()
+
+_MISS = object()
+
+class ResponseCache:
+    """
+    LRU cache with expiry for LLM responses.
+    
+    Keys are hashed with BLAKE2b so long product descriptions and prompts do not
+    become giant dictionary keys. When a cache directory is given and diskcache is
+    installed, entries are persisted there so they survive restarts and are shared
+    between worker processes; otherwise a bounded in-memory LRU is used.
+    """
+    
+    def __init__(self,
+                 cache_dir: Optional[str] = None,
+                 max_entries: int = 4096,
+                 ttl: int = 7 * 86400,
+                 size_limit: int = 512 * 1024 * 1024):
+        """
+        Initialize the response cache.
+        
+        Args:
+            cache_dir: Directory for the persistent cache (None for in-memory only)
+            max_entries: Maximum number of entries kept by the in-memory cache
+            ttl: Time-to-live for cache entries in seconds
+            size_limit: Maximum size in bytes of the persistent cache
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._disk = None
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        
+        if cache_dir:
+            if DiskCache is not None:
+                self._disk = DiskCache(cache_dir, size_limit=size_limit, eviction_policy="least-recently-used")
+            else:
+                logger.warning("diskcache is not installed. LLM responses will be cached in memory only.")
+    
+    @staticmethod
+    def _hash_key(key: str) -> str:
+        """Hash a cache key to a fixed-length digest."""
+        return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Get a cached value.
+        
+        Args:
+            key: Cache key
+            default: Value to return if the key is missing or expired
+            
+        Returns:
+            The cached value or default
+        """
+        hashed_key = self._hash_key(key)
+        if self._disk is not None:
+            return self._disk.get(hashed_key, default=default)
+        
+        with self._lock:
+            entry = self._memory.get(hashed_key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._memory[hashed_key]
+                return default
+            self._memory.move_to_end(hashed_key)
+            return value
+    
+    def set(self, key: str, value: Any) -> None:
+        """
+        Store a value in the cache.
+        
+        Args:
+            key: Cache key
+            value: Value to cache
+        """
+        hashed_key = self._hash_key(key)
+        if self._disk is not None:
+            self._disk.set(hashed_key, value, expire=self.ttl)
+            return
+        
+        with self._lock:
+            self._memory[hashed_key] = (time.monotonic() + self.ttl, value)
+            self._memory.move_to_end(hashed_key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+    
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISS) is not _MISS
+    
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _MISS)
+        if value is _MISS:
+            raise KeyError(key)
+        return value
+    
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.set(key, value)
+
 class LLMService:
     """Service for interacting with OpenAI's API."""
     
-    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4", cache_enabled: bool = True):
+    def __init__(self,
+                 api_key: Optional[str] = None,
+                 model: str = "gpt-4",
+                 cache_enabled: bool = True,
+                 max_rpm: Optional[int] = None,
+                 max_tpm: Optional[int] = None,
+                 max_concurrent: int = 8,
+                 cache_dir: Optional[str] = None,
+                 confidence_model: Optional[str] = None,
+                 explanation_model: Optional[str] = None):
         """
         Initialize the LLM service.
         
         Args:
             api_key: OpenAI API key (defaults to OPENAI_API_KEY environment variable)
-            model: OpenAI model to use
+            model: OpenAI model to use for enhancing product descriptions
             cache_enabled: Whether to cache LLM responses
+            max_rpm: Requests-per-minute limit (defaults to OPENAI_MAX_RPM environment variable)
+            max_tpm: Tokens-per-minute limit (defaults to OPENAI_MAX_TPM environment variable)
+            max_concurrent: Maximum number of concurrent OpenAI requests
+            cache_dir: Directory for the persistent response cache (defaults to LLM_CACHE_DIR
+                environment variable; responses are cached in memory if unset)
+            confidence_model: Model for confidence scoring, a simple ranking task that a
+                smaller model handles well (defaults to OPENAI_CONFIDENCE_MODEL or gpt-4o-mini)
+            explanation_model: Model for tariff explanations (defaults to
+                OPENAI_EXPLANATION_MODEL or gpt-4o)
         """
         # Use provided API key or get from environment
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
-            print("Warning: No OpenAI API key provided. LLM features will be disabled.")
+            logger.warning("No OpenAI API key provided. LLM features will be disabled.")
             
         self.model = model
+        self.confidence_model = confidence_model or os.getenv("OPENAI_CONFIDENCE_MODEL", "gpt-4o-mini")
+        self.explanation_model = explanation_model or os.getenv("OPENAI_EXPLANATION_MODEL", "gpt-4o")
         self.cache_enabled = cache_enabled
-        self.cache = {}
+        self.cache = ResponseCache(cache_dir or os.getenv("LLM_CACHE_DIR"))
+        
+        # Batch API jobs submitted by this service, keyed by batch ID
+        self._batches = {}
+        
+        # Throttle requests before they are sent rather than retrying after 429s
+        self.max_rpm = max_rpm or _env_limit("OPENAI_MAX_RPM")
+        self.max_tpm = max_tpm or _env_limit("OPENAI_MAX_TPM")
+        self.max_concurrent = max_concurrent
+        self.rate_limiter = RateLimiter(self.max_rpm, self.max_tpm, max_concurrent)
         
-        # Set the API key for the openai module
+        # Keep one client with a pooled HTTP connection so TLS and TCP setup are
+        # amortized across the many requests of a catalog run
+        self.client = None
         if self.api_key:
-            openai.api_key = self.api_key
+            self.client = openai.OpenAI(
+                api_key=self.api_key,
+                http_client=httpx.Client(
+                    limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+                    timeout=httpx.Timeout(60.0, connect=5.0)
+                )
+            )
     
     def is_enabled(self) -> bool:
         """Check if the LLM service is enabled (has API key)."""
         return bool(self.api_key)
     
+    def get_cached_analysis(self, product_description: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the product analysis stored when the search query was enhanced.
+        
+        Args:
+            product_description: Description of the product
+            
+        Returns:
+            The product analysis, or None if nothing is cached
+        """
+        return self.cache.get(_ANALYSIS_PREFIX + product_description)
+    
+    def _estimate_tokens(self, messages: List[Dict[str, str]], model: str) -> int:
+        """
+        Estimate the number of prompt tokens in a list of chat messages.
+        
+        Args:
+            messages: Chat messages to be sent
+            model: Model the messages will be sent to
+            
+        Returns:
+            Estimated prompt token count
+        """
+        text = "".join(message["content"] for message in messages)
+        encoding = _get_encoding(model)
+        if encoding is not None:
+            return len(encoding.encode(text)) + 4 * len(messages)
+        # Roughly four characters per token for English text
+        return len(text) // 4 + 4 * len(messages)
+    
+    def _call_chat(self,
+                   messages: List[Dict[str, str]],
+                   temperature: float,
+                   max_tokens: int,
+                   model: Optional[str] = None,
+                   **kwargs) -> Any:
+        """
+        Send a chat completion request, waiting for rate-limit capacity first.
+        
+        Args:
+            messages: Chat messages to send
+            temperature: Sampling temperature
+            max_tokens: Maximum number of completion tokens
+            model: Model to use (defaults to the service's enhancement model)
+            **kwargs: Additional arguments for the completion request
+            
+        Returns:
+            The chat completion response
+        """
+        model = model or self.model
+        self.rate_limiter.acquire(self._estimate_tokens(messages, model) + max_tokens)
+        try:
+            return self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                **kwargs
+            )
+        finally:
+            self.rate_limiter.release()
+    
+    def _stream_chat(self,
+                     messages: List[Dict[str, str]],
+                     temperature: float,
+                     max_tokens: int,
+                     model: Optional[str] = None,
+                     **kwargs) -> Iterator[str]:
+        """
+        Stream a chat completion, yielding content fragments as they are decoded.
+        
+        Args:
+            messages: Chat messages to send
+            temperature: Sampling temperature
+            max_tokens: Maximum number of completion tokens
+            model: Model to use (defaults to the service's enhancement model)
+            **kwargs: Additional arguments for the completion request
+            
+        Yields:
+            Fragments of the response content
+        """
+        model = model or self.model
+        self.rate_limiter.acquire(self._estimate_tokens(messages, model) + max_tokens)
+        try:
+            response = self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                **kwargs
+            )
+            for chunk in response:
+                if chunk.choices:
+                    content = chunk.choices[0].delta.content
+                    if content:
+                        yield content
+        finally:
+            self.rate_limiter.release()
+    
+    def _stream_chat_lines(self,
+                           messages: List[Dict[str, str]],
+                           temperature: float,
+                           max_tokens: int,
+                           model: Optional[str] = None,
+                           **kwargs) -> Iterator[str]:
+        """
+        Stream a chat completion, yielding each line as soon as it is complete.
+        
+        Args:
+            messages: Chat messages to send
+            temperature: Sampling temperature
+            max_tokens: Maximum number of completion tokens
+            model: Model to use (defaults to the service's enhancement model)
+            **kwargs: Additional arguments for the completion request
+            
+        Yields:
+            Complete lines of the response content
+        """
+        pending = ""
+        for content in self._stream_chat(messages, temperature, max_tokens, model, **kwargs):
+            pending += content
+            *lines, pending = pending.split("\n")
+            yield from lines
+        if pending:
+            yield pending
+    
+    def _cached(self, key: str, producer: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for a key, producing and caching it on a miss.
+        
+        Args:
+            key: Cache key
+            producer: Callable computing the value; exceptions propagate and nothing is cached
+            
+        Returns:
+            The cached or newly produced value
+        """
+        if not self.cache_enabled:
+            return producer()
+        
+        value = self.cache.get(key, _MISS)
+        if value is _MISS:
+            value = producer()
+            self.cache[key] = value
+        return value
+    
     def enhance_search_query(self, product_description: str) -> List[str]:
         """
         Use LLM to enhance the product description for better HTS matching.
@@ -58,102 +624,161 @@ class LLMService:
             # Fallback when LLM is not available
             return [product_description]
             
-        # Check cache first if enabled
-        cache_key = f"enhance_{product_description}"
-        if self.cache_enabled and cache_key in self.cache:
-            return self.cache[cache_key]
-        
         try:
-            prompt = f"""
-            You are a tariff classification expert with deep knowledge of the Harmonized Tariff Schedule (HTS).
-            
-            IMPORTANT CONTEXT ABOUT HTS:
-            - The HTS is not a list of specific products but a hierarchical classification system
-            - Products are categorized based primarily on material composition and function
-            - The HTS uses formal terminology that often differs from common commercial terms
-            - For example, "phone chargers" are listed as "static converters for telecommunication devices"
-            
-            TASK:
-            Analyze this product description and identify the appropriate HTS codes and search terms:
-            
-            Product: {product_description}
-            
-            Provide the following:
-            1. MATERIALS: List the primary materials (e.g., plastic, steel, textile)
-            2. FUNCTION: Describe the primary function in formal terms
-            3. INDUSTRY_TERMS: Provide industry-specific terminology
-            4. HTS_TERMINOLOGY: Convert to formal HTS terminology
-            5. HTS_CODES: Provide 3-5 specific HTS codes that would be appropriate for this product. Be as specific as possible, including subheadings (e.g., 8708.10.60 rather than just 8708.10). For automotive parts, consider codes like 8708.10.60 for bumper parts, 8708.29 for body parts, etc.
-            6. SEARCH_TERMS: Generate 5-7 specific search terms that would yield accurate HTS codes
+            return self._cached(f"enhance_{product_description}", lambda: self._enhance(product_description))
             
-            Format your response as a structured list with clear headings for each section.
-            
-            IMPORTANT: For HTS_CODES, provide the most specific codes possible, including all available digits and subheadings. For example, use "8708.10.6030" instead of just "8708.10" for automotive bumper parts. The more specific the code, the better the search results will be.
-            """
+        except Exception as e:
+            logger.warning("LLM query failed: %s", e)
+            # Fallback to original description
+            return [product_description]
+    
+    def enhance_search_queries(self, product_descriptions: List[str]) -> List[List[str]]:
+        """
+        Enhance many product descriptions, querying the LLM once per distinct description.
+        
+        Descriptions are canonicalized (lowercased, whitespace collapsed) so repeated
+        catalog rows share one request; the distinct ones are enhanced concurrently and
+        the results scattered back to every matching row.
+        
+        Args:
+            product_descriptions: Original product descriptions
             
-            # Check if the model supports JSON response format
-            supports_json_format = self.model in ["gpt-4-turbo", "gpt-4-1106-preview", "gpt-4-0125-preview", "gpt-3.5-turbo-1106"]
+        Returns:
+            List of enhanced search terms for each description, in the same order
+        """
+        canonical = [re.sub(r"\s+", " ", description.strip().lower()) for description in product_descriptions]
+        
+        # Enhance the first original spelling of each distinct description
+        representatives = {}
+        for key, description in zip(canonical, product_descriptions):
+            representatives.setdefault(key, description)
+        
+        if not representatives:
+            return []
+        
+        with ThreadPoolExecutor(max_workers=min(len(representatives), self.max_concurrent)) as executor:
+            results = dict(zip(
+                representatives,
+                executor.map(self.enhance_search_query, representatives.values())
+            ))
+        
+        # Give every row its own list so callers can extend it safely
+        return [list(results[key]) for key in canonical]
+    
+    def _enhance(self, product_description: str) -> List[str]:
+        """
+        Query the LLM for search terms, bypassing the cache.
+        
+        Args:
+            product_description: Original product description
             
-            if supports_json_format:
-                response = openai.ChatCompletion.create(
-                    model=self.model,
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0.3,  # Lower temperature for more focused responses
-                    max_tokens=500,
-                    response_format={"type": "json_object"}
-                )
-                
-                result = json.loads(response.choices[0].message.content.strip())
-            else:
-                # For models that don't support JSON response format
-                response = openai.ChatCompletion.create(
-                    model=self.model,
-                    messages=[{"role": "user", "content": prompt + "\n\nEven though I asked for JSON, please format your response as a structured list with clear headings."}],
-                    temperature=0.3,  # Lower temperature for more focused responses
-                    max_tokens=500
-                )
-                
-                # Parse the text response into a structured format
-                content = response.choices[0].message.content.strip()
-                result = self._parse_structured_response(content, product_description)
+        Returns:
+            List of enhanced search terms including specific HTS codes
+        """
+        request = self._enhance_request(product_description)
+        response = self._call_chat(**request)
+        
+        content = response.choices[0].message.content.strip()
+        result = self._parse_enhance_content(content, product_description, "response_format" in request)
+        
+        return self._store_enhancement(product_description, result)
+    
+    def _enhance_request(self, product_description: str) -> Dict[str, Any]:
+        """
+        Build the chat completion arguments for enhancing a product description.
+        
+        Args:
+            product_description: Original product description
             
-            # Extract search terms and HTS codes from the response
-            search_terms = result.get("SEARCH_TERMS", [])
-            hts_codes = result.get("HTS_CODES", [])
+        Returns:
+            Keyword arguments for the chat completion request
+        """
+        # Check if the model supports Structured Outputs or JSON response format
+        mode = _response_format_mode(self.model)
+        
+        request = {
+            "model": self.model,
+            "temperature": 0.3,  # Lower temperature for more focused responses
+            "max_tokens": 350  # A complete analysis rarely needs more than ~250 tokens
+        }
+        
+        if mode == "json_schema":
+            system_prompt = ENHANCE_SYSTEM_PROMPT
+            request["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": "hts_analysis", "strict": True, "schema": HTS_ANALYSIS_SCHEMA}
+            }
+        elif mode == "json_object":
+            system_prompt = ENHANCE_SYSTEM_PROMPT + "\n\nRespond with a JSON object using the keys MATERIALS, FUNCTION, INDUSTRY_TERMS, HTS_TERMINOLOGY, HTS_CODES and SEARCH_TERMS."
+            request["response_format"] = {"type": "json_object"}
+        else:
+            # For models that don't support JSON response format
+            system_prompt = ENHANCE_SYSTEM_PROMPT + "\n\nFormat your response as a structured list with clear headings for each section."
+        
+        request["messages"] = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"Product: {product_description}"}
+        ]
+        
+        return request
+    
+    def _parse_enhance_content(self, content: str, product_description: str, is_json: bool) -> Dict[str, Any]:
+        """
+        Parse the content of an enhancement response into a product analysis.
+        
+        Args:
+            content: Response content from the LLM
+            product_description: Original product description
+            is_json: Whether the response was requested in JSON format
             
-            # If no search terms were provided, fall back to the original description
-            if not search_terms:
-                search_terms = [product_description]
+        Returns:
+            Dictionary with the product analysis
+        """
+        if is_json:
+            return json.loads(content)
+        
+        # Parse the text response into a structured format
+        return self._parse_structured_response(content, product_description)
+    
+    def _store_enhancement(self, product_description: str, result: Dict[str, Any]) -> List[str]:
+        """
+        Derive search terms from a product analysis and cache the analysis.
+        
+        Args:
+            product_description: Original product description
+            result: Product analysis from the LLM
             
-            # Always include the original description as one of the search terms
-            if product_description not in search_terms:
-                search_terms.append(product_description)
+        Returns:
+            List of enhanced search terms including specific HTS codes
+        """
+        # Extract search terms and HTS codes from the response
+        search_terms = result.get("SEARCH_TERMS", [])
+        hts_codes = result.get("HTS_CODES", [])
+        
+        # If no search terms were provided, fall back to the original description
+        if not search_terms:
+            search_terms = [product_description]
+        
+        # Always include the original description as one of the search terms
+        if product_description not in search_terms:
+            search_terms.append(product_description)
+        
+        # Add HTS codes to the search terms
+        for code in hts_codes:
+            # Clean up the code (remove any text after the code and any trailing punctuation)
+            code_parts = code.split(' ', 1)
+            clean_code = code_parts[0].strip().rstrip(':;,.')
             
-            # Add HTS codes to the search terms
-            for code in hts_codes:
-                # Clean up the code (remove any text after the code and any trailing punctuation)
-                code_parts = code.split(' ', 1)
-                clean_code = code_parts[0].strip().rstrip(':;,.')
-                
-                # Only add valid HTS codes (should contain numbers and dots)
-                if any(c.isdigit() for c in clean_code) and '.' in clean_code:
-                    if clean_code not in search_terms:
-                        search_terms.append(clean_code)
-                        print(f"DEBUG: Adding HTS code '{clean_code}' to search terms")
-            
-            # Store the full analysis for later use
-            self.cache[f"analysis_{product_description}"] = result
-            
-            # Cache the results if enabled
-            if self.cache_enabled:
-                self.cache[cache_key] = search_terms
-                
-            return search_terms
+            # Only add valid HTS codes (should contain numbers and dots)
+            if any(c.isdigit() for c in clean_code) and '.' in clean_code:
+                if clean_code not in search_terms:
+                    search_terms.append(clean_code)
+                    logger.debug("Adding HTS code '%s' to search terms", clean_code)
+        
+        # Store the full analysis for later use
+        self.cache[_ANALYSIS_PREFIX + product_description] = result
             
-        except Exception as e:
-            print(f"LLM query failed: {e}")
-            # Fallback to original description
-            return [product_description]
+        return search_terms
     
     def _parse_structured_response(self, content: str, product_description: str) -> Dict[str, Any]:
         """
@@ -175,79 +800,25 @@ class LLMService:
             "SEARCH_TERMS": []
         }
         
-        # Simple parsing logic for structured text
+        # Walk the lines once, switching section whenever a header line is matched
         current_section = None
-        lines = content.split('\n')
-        
-        for line in lines:
+        for line in content.split('\n'):
             line = line.strip()
             if not line:
                 continue
-                
-            # Check for section headers
-            if "MATERIALS:" in line.upper() or "1. MATERIALS" in line:
-                current_section = "MATERIALS"
-                line = line.split(":", 1)[1].strip() if ":" in line else ""
-            elif "FUNCTION:" in line.upper() or "2. FUNCTION" in line:
-                current_section = "FUNCTION"
-                line = line.split(":", 1)[1].strip() if ":" in line else ""
-            elif "INDUSTRY" in line.upper() or "3. INDUSTRY" in line:
-                current_section = "INDUSTRY_TERMS"
-                line = line.split(":", 1)[1].strip() if ":" in line else ""
-            elif "HTS_TERMINOLOGY" in line.upper() or "4. HTS_TERMINOLOGY" in line:
-                current_section = "HTS_TERMINOLOGY"
-                line = line.split(":", 1)[1].strip() if ":" in line else ""
-            elif "HTS_CODES" in line.upper() or "5. HTS_CODES" in line:
-                current_section = "HTS_CODES"
-                line = line.split(":", 1)[1].strip() if ":" in line else ""
-            elif "SEARCH" in line.upper() or "6. SEARCH" in line:
-                current_section = "SEARCH_TERMS"
-                line = line.split(":", 1)[1].strip() if ":" in line else ""
-                
-            # Process content based on current section
-            if current_section and line and not line.startswith(str(current_section)):
-                if current_section == "MATERIALS":
-                    if line.startswith("- "):
-                        result["MATERIALS"].append(line[2:])
-                    elif line.startswith("* "):
-                        result["MATERIALS"].append(line[2:])
-                    elif "," in line:
-                        result["MATERIALS"].extend([m.strip() for m in line.split(",")])
-                    else:
-                        result["MATERIALS"].append(line)
-                elif current_section == "FUNCTION":
-                    result["FUNCTION"] += line + " "
-                elif current_section == "INDUSTRY_TERMS":
-                    if line.startswith("- "):
-                        result["INDUSTRY_TERMS"].append(line[2:])
-                    elif line.startswith("* "):
-                        result["INDUSTRY_TERMS"].append(line[2:])
-                    elif "," in line:
-                        result["INDUSTRY_TERMS"].extend([t.strip() for t in line.split(",")])
-                    else:
-                        result["INDUSTRY_TERMS"].append(line)
-                elif current_section == "HTS_TERMINOLOGY":
-                    result["HTS_TERMINOLOGY"] += line + " "
-                elif current_section == "HTS_CODES":
-                    if line.startswith("- "):
-                        result["HTS_CODES"].append(line[2:])
-                    elif line.startswith("* "):
-                        result["HTS_CODES"].append(line[2:])
-                    elif "," in line:
-                        result["HTS_CODES"].extend([c.strip() for c in line.split(",")])
-                    else:
-                        result["HTS_CODES"].append(line)
-                elif current_section == "SEARCH_TERMS":
-                    if line.startswith("- "):
-                        result["SEARCH_TERMS"].append(line[2:])
-                    elif line.startswith("* "):
-                        result["SEARCH_TERMS"].append(line[2:])
-                    elif line.startswith('"') and line.endswith('"'):
-                        result["SEARCH_TERMS"].append(line.strip('"'))
-                    elif "," in line:
-                        result["SEARCH_TERMS"].extend([t.strip() for t in line.split(",")])
-                    else:
-                        result["SEARCH_TERMS"].append(line)
+            
+            match = _SECTION_RE.match(line)
+            if match:
+                current_section = match.group("section").upper().replace(" ", "_")
+                line = (match.group("rest") or "").strip()
+            
+            if not current_section or not line:
+                continue
+            
+            if current_section in _LIST_SECTIONS:
+                self._append_list_item(result[current_section], line)
+            else:
+                result[current_section] += line + " "
         
         # Clean up the results
         result["FUNCTION"] = result["FUNCTION"].strip()
@@ -259,12 +830,31 @@ class LLMService:
             
         return result
     
+    @staticmethod
+    def _append_list_item(items: List[str], line: str) -> None:
+        """
+        Append the entries on one line of a list section.
+        
+        Args:
+            items: List for the current section
+            line: Line content with any section header removed
+        """
+        if line.startswith(("- ", "* ")):
+            items.append(line[2:])
+        elif line.startswith('"') and line.endswith('"'):
+            items.append(line.strip('"'))
+        elif "," in line:
+            items.extend(item.strip() for item in line.split(","))
+        else:
+            items.append(line)
+    
     def generate_tariff_explanation(self, 
                                    hts_code: str, 
                                    description: str, 
                                    rates: Dict[str, Any], 
                                    countries: Dict[str, str],
-                                   trade_agreements: Optional[Dict[str, Any]] = None) -> str:
+                                   trade_agreements: Optional[Dict[str, Any]] = None,
+                                   on_token: Optional[Callable[[str], None]] = None) -> str:
         """
         Generate plain-language explanation of tariff information.
         
@@ -274,6 +864,8 @@ class LLMService:
             rates: Dictionary of duty rates
             countries: Dictionary with origin and destination countries
             trade_agreements: Optional trade agreement eligibility information
+            on_token: Optional callback receiving each fragment of the explanation as it
+                is generated, so callers can render it before the response is complete
             
         Returns:
             Plain-language explanation of the tariff information
@@ -282,59 +874,82 @@ class LLMService:
             # Fallback when LLM is not available
             return f"Tariff information for {description} (HTS: {hts_code})"
             
-        # Check cache first if enabled
-        cache_key = f"explain_{hts_code}_{countries['origin']}_{countries['destination']}"
-        if self.cache_enabled and cache_key in self.cache:
-            return self.cache[cache_key]
+        # The cache key covers every input to the prompt so that
+        # different rate tables or agreements for the same code do not collide; the
+        # cache hashes it down to a fixed-length digest.
+        cache_key = "explain_" + json.dumps({
+            "c": hts_code,
+            "d": description,
+            "r": rates,
+            "a": trade_agreements,
+            "o": countries["origin"],
+            "dst": countries["destination"]
+        }, sort_keys=True, separators=(",", ":"), default=str)
         
         try:
-            # Format rates for the prompt
-            rates_str = json.dumps(rates, indent=2)
-            
-            # Format trade agreements for the prompt
-            if trade_agreements:
-                agreements_str = json.dumps(trade_agreements, indent=2)
-            else:
-                agreements_str = "No trade agreement information available"
-            
-            prompt = f"""
-            You are a tariff expert. Explain the following tariff information in plain language:
-            
-            HTS Code: {hts_code}
-            Description: {description}
-            Rates: {rates_str}
-            Countries: Origin - {countries['origin']}, Destination - {countries['destination']}
-            Trade Agreements: {agreements_str}
-            
-            Provide:
-            1. A simple explanation of what this product category includes
-            2. An interpretation of the applicable duty rates
-            3. Potential trade agreement benefits
-            4. Key considerations for importers
-            
-            Keep your response under 250 words and focus on practical implications.
-            """
-            
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.5,
-                max_tokens=350
-            )
-            
-            explanation = response.choices[0].message.content.strip()
-            
-            # Cache the results if enabled
-            if self.cache_enabled:
-                self.cache[cache_key] = explanation
-                
-            return explanation
+            return self._cached(cache_key, lambda: self._explain(
+                hts_code, description, rates, countries, trade_agreements, on_token
+            ))
             
         except Exception as e:
-            print(f"LLM explanation failed: {e}")
+            logger.warning("LLM explanation failed: %s", e)
             # Fallback explanation
             return f"This product ({description}) is classified under HTS code {hts_code}. The general duty rate is {rates.get('general', 'unknown')}. Check with a customs broker for specific details."
     
+    def _explain(self,
+                 hts_code: str,
+                 description: str,
+                 rates: Dict[str, Any],
+                 countries: Dict[str, str],
+                 trade_agreements: Optional[Dict[str, Any]],
+                 on_token: Optional[Callable[[str], None]]) -> str:
+        """
+        Query the LLM for a tariff explanation, bypassing the cache.
+        
+        Args:
+            hts_code: The HTS code
+            description: Product description
+            rates: Dictionary of duty rates
+            countries: Dictionary with origin and destination countries
+            trade_agreements: Optional trade agreement eligibility information
+            on_token: Optional callback receiving each fragment of the explanation
+            
+        Returns:
+            Plain-language explanation of the tariff information
+        """
+        # Format rates for the prompt (compact separators keep the prompt short)
+        rates_str = json.dumps(rates, separators=(",", ":"))
+        
+        # Format trade agreements for the prompt
+        if trade_agreements:
+            agreements_str = json.dumps(trade_agreements, separators=(",", ":"))
+        else:
+            agreements_str = "No trade agreement information available"
+        
+        prompt = (
+            f"HTS Code: {hts_code}\n"
+            f"Description: {description}\n"
+            f"Rates: {rates_str}\n"
+            f"Countries: Origin - {countries['origin']}, Destination - {countries['destination']}\n"
+            f"Trade Agreements: {agreements_str}"
+        )
+        
+        fragments = []
+        for content in self._stream_chat(
+            messages=[
+                {"role": "system", "content": EXPLANATION_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.5,
+            max_tokens=350,
+            model=self.explanation_model
+        ):
+            fragments.append(content)
+            if on_token:
+                on_token(content)
+        
+        return "".join(fragments).strip()
+    
     def analyze_hs_code_confidence(self, product_description: str, hts_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Analyze the confidence level for HTS code matches based on product description.
@@ -353,85 +968,352 @@ class LLMService:
             return hts_results
             
         try:
-            # Format the HTS results for the prompt
-            hts_items = []
-            for i, result in enumerate(hts_results[:10]):  # Limit to top 10 for prompt size
-                hts_items.append(f"{i+1}. {result['hts_code']} - {result['description']}")
+            # Results the analysis does not score keep the default assessment
+            confidences = ["Medium"] * len(hts_results)
+            reasons = ["Default assessment"] * len(hts_results)
             
-            hts_list = "\n".join(hts_items)
+            # Parse each line as soon as it has been streamed
+            for line in self._stream_chat_lines(**self._confidence_request(product_description, hts_results)):
+                self._parse_confidence_line(line, confidences, reasons)
             
-            prompt = f"""
-            You are a tariff classification expert. Analyze the following product description 
-            and potential HTS code matches. Assign a confidence score (High, Medium, or Low) 
-            to each match based on how well it describes the product.
+            self._apply_confidences(hts_results, confidences, reasons)
+            return hts_results
+            
+        except Exception as e:
+            logger.warning("LLM confidence analysis failed: %s", e)
+            # Fallback confidence assignment
+            for result in hts_results:
+                result["confidence"] = "Medium"
+            return hts_results
+    
+    def _confidence_request(self, product_description: str, hts_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Build the chat completion arguments for scoring HTS code matches.
+        
+        Args:
+            product_description: Original product description
+            hts_results: List of HTS code results from the API
+            
+        Returns:
+            Keyword arguments for the chat completion request
+        """
+        # Format the HTS results for the prompt
+        hts_items = []
+        for i, result in enumerate(hts_results[:10]):  # Limit to top 10 for prompt size
+            hts_items.append(f"{i+1}. {result['hts_code']} - {result['description']}")
+        
+        hts_list = "\n".join(hts_items)
+        
+        prompt = f"""
+        You are a tariff classification expert. Analyze the following product description 
+        and potential HTS code matches. Assign a confidence score (High, Medium, or Low) 
+        to each match based on how well it describes the product.
+        
+        Product Description: {product_description}
+        
+        Potential HTS Codes:
+        {hts_list}
+        
+        For each numbered item, provide only the confidence level (High, Medium, or Low) 
+        and a very brief explanation (10 words or less). Format as:
+        1. [Confidence]: [Brief reason]
+        2. [Confidence]: [Brief reason]
+        ...
+        """
+        
+        request = {
+            "model": self.confidence_model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": 0.3,
+            # About 30 tokens per "N. Level: reason" line is enough; decode time is
+            # linear in the tokens generated, so do not reserve more than needed
+            "max_tokens": 30 * len(hts_items) + 10
+        }
+        
+        logit_bias = _confidence_logit_bias(self.confidence_model)
+        if logit_bias:
+            request["logit_bias"] = logit_bias
+        
+        return request
+    
+    def _parse_confidence_line(self, line: str, confidences: List[str], reasons: List[str]) -> None:
+        """
+        Parse one line of a confidence analysis into the confidence and reason lists.
+        
+        Args:
+            line: Line of the LLM response, e.g. "1. High: matches bumper parts"
+            confidences: Confidence level for each HTS result
+            reasons: Confidence reason for each HTS result
+        """
+        match = _CONF_RE.match(line)
+        if match:
+            self._set_confidence(confidences, reasons, *match.groups())
+    
+    def _parse_confidence_analysis(self, analysis: str, confidences: List[str], reasons: List[str]) -> None:
+        """
+        Parse a complete confidence analysis into the confidence and reason lists.
+        
+        Args:
+            analysis: Full LLM response with one numbered line per result
+            confidences: Confidence level for each HTS result
+            reasons: Confidence reason for each HTS result
+        """
+        for index, level, reason in _CONF_RE.findall(analysis):
+            self._set_confidence(confidences, reasons, index, level, reason)
+    
+    @staticmethod
+    def _set_confidence(confidences: List[str], reasons: List[str], index: str, level: str, reason: str) -> None:
+        """Record a parsed confidence level for the result with the given 1-based index."""
+        i = int(index) - 1
+        if 0 <= i < len(confidences):
+            confidences[i] = level.title()
+            reasons[i] = reason.strip() or level.title()
+    
+    @staticmethod
+    def _apply_confidences(hts_results: List[Dict[str, Any]], confidences: List[str], reasons: List[str]) -> None:
+        """Write the parsed confidence levels and reasons onto the HTS results in one pass."""
+        for result, confidence, reason in zip(hts_results, confidences, reasons):
+            result["confidence"] = confidence
+            result["confidence_reason"] = reason
+    
+    def analyze_hs_code_confidence_batch(self, items: List[Tuple[str, List[Dict[str, Any]]]]) -> List[List[Dict[str, Any]]]:
+        """
+        Analyze confidence levels for several products in a single request.
+        
+        Each product's candidate list is labelled with a letter so the model can
+        score all of them in one response, paying the round-trip and instruction
+        tokens once instead of once per product.
+        
+        Args:
+            items: List of (product_description, hts_results) pairs
+            
+        Returns:
+            List of enhanced HTS result lists, in the same order as items
+        """
+        if not items:
+            return []
+        
+        if not self.is_enabled():
+            return [self.analyze_hs_code_confidence(description, results) for description, results in items]
+        
+        # Split large workloads into parallel batches
+        if len(items) > CONFIDENCE_BATCH_SIZE:
+            batches = [items[i:i + CONFIDENCE_BATCH_SIZE] for i in range(0, len(items), CONFIDENCE_BATCH_SIZE)]
+            with ThreadPoolExecutor(max_workers=min(len(batches), self.max_concurrent)) as executor:
+                batch_results = list(executor.map(self.analyze_hs_code_confidence_batch, batches))
+            return [results for batch in batch_results for results in batch]
+        
+        labels = string.ascii_uppercase[:len(items)]
+        
+        # Results the analysis does not score keep the default assessment
+        confidences = {label: ["Medium"] * len(hts_results) for label, (_, hts_results) in zip(labels, items)}
+        reasons = {label: ["Default assessment"] * len(hts_results) for label, (_, hts_results) in zip(labels, items)}
+        
+        try:
+            # Format each product and its candidates for the prompt
+            sections = []
+            candidate_count = 0
+            for label, (product_description, hts_results) in zip(labels, items):
+                hts_items = []
+                for i, result in enumerate(hts_results[:10]):  # Limit to top 10 per product
+                    hts_items.append(f"{label}.{i+1}. {result['hts_code']} - {result['description']}")
+                candidate_count += len(hts_items)
+                sections.append(
+                    f"Product {label}: {product_description}\n"
+                    f"Candidates {label}:\n" + "\n".join(hts_items)
+                )
+            
+            if not candidate_count:
+                return [hts_results for _, hts_results in items]
+            
+            products_list = "\n\n".join(sections)
             
-            Product Description: {product_description}
+            prompt = f"""
+            You are a tariff classification expert. For each product below, analyze its
+            potential HTS code matches. Assign a confidence score (High, Medium, or Low)
+            to each match based on how well it describes that product.
             
-            Potential HTS Codes:
-            {hts_list}
+            {products_list}
             
-            For each numbered item, provide only the confidence level (High, Medium, or Low) 
-            and a very brief explanation (10 words or less). Format as:
-            1. [Confidence]: [Brief reason]
-            2. [Confidence]: [Brief reason]
+            For each candidate, provide only the confidence level (High, Medium, or Low)
+            and a very brief explanation (10 words or less), using the candidate's label. Format as:
+            A.1: [Confidence]: [Brief reason]
+            A.2: [Confidence]: [Brief reason]
+            B.1: [Confidence]: [Brief reason]
             ...
             """
             
-            response = openai.ChatCompletion.create(
-                model=self.model,
+            response = self._call_chat(
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.3,
-                max_tokens=250
+                max_tokens=30 * candidate_count + 10,
+                model=self.confidence_model
             )
             
             analysis = response.choices[0].message.content.strip()
             
-            # Parse the analysis and update the results
-            lines = analysis.split('\n')
-            for line in lines:
-                if ':' not in line:
-                    continue
-                    
-                try:
-                    # Extract the index and confidence
-                    parts = line.split(':', 1)
-                    index_part = parts[0].strip()
-                    if not index_part[0].isdigit():
-                        continue
-                        
-                    index = int(index_part.split('.')[0]) - 1
-                    confidence_part = parts[1].strip()
-                    
-                    # Extract confidence level
-                    if "high" in confidence_part.lower():
-                        confidence = "High"
-                    elif "medium" in confidence_part.lower():
-                        confidence = "Medium"
-                    elif "low" in confidence_part.lower():
-                        confidence = "Low"
-                    else:
-                        confidence = "Medium"  # Default
-                    
-                    # Update the result if index is valid
-                    if 0 <= index < len(hts_results):
-                        hts_results[index]["confidence"] = confidence
-                        hts_results[index]["confidence_reason"] = confidence_part
-                        
-                except Exception as e:
-                    print(f"Error parsing confidence line: {e}")
-                    continue
+            # Scatter the flat response back into the per-product lists
+            for label, index, confidence, reason in _BATCH_CONFIDENCE_RE.findall(analysis):
+                label = label.upper()
+                if label in confidences:
+                    self._set_confidence(confidences[label], reasons[label], index, confidence, reason)
             
-            # Set default confidence for any results without a score
-            for result in hts_results:
-                if "confidence" not in result:
-                    result["confidence"] = "Medium"
-                    result["confidence_reason"] = "Default assessment"
+        except Exception as e:
+            logger.warning("LLM batch confidence analysis failed: %s", e)
+        
+        for label, (_, hts_results) in zip(labels, items):
+            self._apply_confidences(hts_results, confidences[label], reasons[label])
+        
+        return [hts_results for _, hts_results in items]
+    
+    def submit_batch(self,
+                     products: List[str],
+                     kind: Literal["enhance", "confidence"] = "enhance",
+                     hts_results: Optional[List[List[Dict[str, Any]]]] = None) -> str:
+        """
+        Submit a bulk workload to the OpenAI Batch API.
+        
+        Batch requests are billed at half the synchronous price and draw on a separate
+        rate-limit pool, but complete within 24 hours, so this path is only suitable
+        for work that is not time-sensitive, such as classifying a whole catalog.
+        
+        Args:
+            products: Product descriptions to process
+            kind: "enhance" to generate search terms, "confidence" to score HTS matches
+            hts_results: For "confidence", the HTS results to score for each product
             
-            return hts_results
+        Returns:
+            ID of the submitted batch
+        """
+        if not self.is_enabled():
+            raise ValueError("The Batch API requires an OpenAI API key")
+        if kind not in ("enhance", "confidence"):
+            raise ValueError(f"Unknown batch kind: {kind}")
+        if kind == "confidence" and (hts_results is None or len(hts_results) != len(products)):
+            raise ValueError("Confidence batches need one list of HTS results per product")
+        
+        # Write one chat completion request per product
+        lines = []
+        is_json = False
+        for i, product_description in enumerate(products):
+            if kind == "enhance":
+                request = self._enhance_request(product_description)
+                is_json = "response_format" in request
+            else:
+                request = self._confidence_request(product_description, hts_results[i])
+            lines.append(json.dumps({
+                "custom_id": f"{kind}-{i}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": request
+            }))
+        
+        batch_file = self.client.files.create(
+            file=(f"{kind}_batch.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch"
+        )
+        
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+            metadata={"kind": kind, "products": str(len(products))}
+        )
+        
+        # Keep the job details in the response cache as well, so a batch can still
+        # be collected after a restart when the cache is persisted to disk
+        batch_id = batch.id
+        job = {
+            "kind": kind,
+            "products": list(products),
+            "hts_results": hts_results,
+            "is_json": is_json
+        }
+        self._batches[batch_id] = job
+        self.cache.set(_BATCH_PREFIX + batch_id, job)
+        return batch_id
+    
+    def poll_batch(self, batch_id: str) -> Dict[str, Any]:
+        """
+        Get the current state of a submitted batch.
+        
+        Args:
+            batch_id: ID returned by submit_batch
             
-        except Exception as e:
-            print(f"LLM confidence analysis failed: {e}")
-            # Fallback confidence assignment
-            for result in hts_results:
-                result["confidence"] = "Medium"
-            return hts_results
+        Returns:
+            Batch object from the API, including its "status"
+        """
+        return self.client.batches.retrieve(batch_id).model_dump()
+    
+    def collect_batch(self, batch_id: str) -> List[Any]:
+        """
+        Collect the results of a completed batch.
+        
+        Requests that failed inside the batch fall back to the product description as
+        the only search term ("enhance") or to default confidence scores ("confidence").
+        
+        Args:
+            batch_id: ID returned by submit_batch
+            
+        Returns:
+            List with, for each submitted product in input order, its search terms
+            ("enhance") or its HTS results with confidence scores ("confidence")
+        """
+        job = self._batches.get(batch_id) or self.cache.get(_BATCH_PREFIX + batch_id)
+        if job is None:
+            raise ValueError(
+                f"Unknown batch: {batch_id}. Set LLM_CACHE_DIR to collect batches "
+                "submitted by another process."
+            )
+        
+        batch = self.poll_batch(batch_id)
+        if batch.get("status") != "completed":
+            raise ValueError(f"Batch {batch_id} is not complete (status: {batch.get('status')})")
+        
+        # Failed requests are written to a separate error file
+        error_file_id = batch.get("error_file_id")
+        if error_file_id:
+            logger.warning(
+                "Batch %s has failed requests (%s); see error file %s",
+                batch_id, batch.get("request_counts"), error_file_id
+            )
+        
+        # Index the response content by request ID
+        contents = {}
+        output_file_id = batch.get("output_file_id")
+        if output_file_id:
+            output = self.client.files.content(output_file_id)
+            for line in output.text.splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                response = record.get("response") or {}
+                if response.get("status_code") == 200:
+                    contents[record["custom_id"]] = response["body"]["choices"][0]["message"]["content"].strip()
+        else:
+            logger.warning("Batch %s produced no output file (error file: %s)", batch_id, error_file_id)
+        
+        results = []
+        for i, product_description in enumerate(job["products"]):
+            content = contents.get(f"{job['kind']}-{i}")
+            
+            if job["kind"] == "enhance":
+                search_terms = [product_description]
+                if content is not None:
+                    try:
+                        analysis = self._parse_enhance_content(content, product_description, job["is_json"])
+                        search_terms = self._store_enhancement(product_description, analysis)
+                        if self.cache_enabled:
+                            self.cache[f"enhance_{product_description}"] = search_terms
+                    except Exception as e:
+                        logger.warning("Failed to parse batch result for '%s': %s", product_description, e)
+                results.append(search_terms)
+            else:
+                hts_results = job["hts_results"][i]
+                confidences = ["Medium"] * len(hts_results)
+                reasons = ["Default assessment"] * len(hts_results)
+                self._parse_confidence_analysis(content or "", confidences, reasons)
+                self._apply_confidences(hts_results, confidences, reasons)
+                results.append(hts_results)
+        
+        return results
@@ -0,0 +1,33 @@
+"""
+Logging Configuration Module
+
+This module configures logging for the TIA application entry points. Library
+modules under ``utils`` only create their loggers with ``getLogger(__name__)``.
+"""
+
+import logging
+import os
+
+
+def configure_logging(default_level: str = "WARNING") -> None:
+    """
+    Configure the root logger from the LOG_LEVEL environment variable.
+    
+    Args:
+        default_level: Level used when LOG_LEVEL is unset or invalid
+    """
+    level_name = os.getenv("LOG_LEVEL", default_level).strip().upper()
+    level = logging.getLevelName(level_name)
+    invalid = not isinstance(level, int)
+    if invalid:
+        level = logging.getLevelName(default_level)
+    
+    logging.basicConfig(
+        level=level,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    
+    if invalid:
+        logging.getLogger(__name__).warning(
+            "Invalid LOG_LEVEL %r, falling back to %s", level_name, default_level
+        )
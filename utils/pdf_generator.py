@@ -4,15 +4,226 @@ PDF Generator for TariffDoc AI
 This module handles the generation of PDF documents containing tariff information.
 """
 
+from __future__ import annotations
+
 import os
 import io
+import re
+import copy
+import functools
+from xml.sax.saxutils import escape
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Any, Optional, BinaryIO
+from typing import Dict, List, Any, Optional, BinaryIO, Tuple
 from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
+from reportlab.pdfbase import pdfmetrics
+from reportlab.platypus import BaseDocTemplate, Frame, PageTemplate, Paragraph, Spacer, Table, TableStyle, Image
+
+# Helvetica-Bold is one of the standard Type1 fonts, so there is no TTF file to
+# register. Looking it up once at import loads its metrics into the font registry
+# before the first document is laid out, rather than during it.
+_BOLD_FONT = "Helvetica-Bold"
+pdfmetrics.getFont(_BOLD_FONT)
+
+def _build_styles():
+    """
+    Build the stylesheet used for tariff documents.
+    
+    Returns:
+        The sample stylesheet extended with the custom Tariff* paragraph styles
+    """
+    styles = getSampleStyleSheet()
+    
+    # Create custom styles with unique names
+    styles.add(ParagraphStyle(
+        name='TariffHeading1',
+        parent=styles['Heading1'],
+        fontSize=16,
+        spaceAfter=12
+    ))
+    
+    styles.add(ParagraphStyle(
+        name='TariffHeading2',
+        parent=styles['Heading2'],
+        fontSize=14,
+        spaceAfter=10
+    ))
+    
+    styles.add(ParagraphStyle(
+        name='TariffNormal',
+        parent=styles['Normal'],
+        fontSize=10,
+        spaceAfter=8
+    ))
+    
+    styles.add(ParagraphStyle(
+        name='TariffItalic',
+        parent=styles['Italic'],
+        fontSize=10,
+        spaceAfter=8
+    ))
+    
+    styles.add(ParagraphStyle(
+        name='TariffBold',
+        parent=styles['Normal'],
+        fontSize=10,
+        fontName=_BOLD_FONT,
+        spaceAfter=8
+    ))
+    
+    styles.add(ParagraphStyle(
+        name='TariffSmallText',
+        parent=styles['Normal'],
+        fontSize=8,
+        spaceAfter=6
+    ))
+    
+    return styles
+
+# The stylesheet never changes, so it is built once at import and shared by all
+# generators. Treat it as read-only; copy it before customizing styles per instance.
+_STYLES = _build_styles()
+
+# Footer disclaimer printed at the end of every document
+_DISCLAIMER_TEXT = (
+    "DISCLAIMER: This document is provided for informational purposes only and does not constitute "
+    "legal advice. The information contained herein is believed to be accurate as of the date of "
+    "generation, but tariff classifications and duty rates are subject to change. Users should "
+    "consult with a licensed customs broker or trade attorney for specific guidance. "
+    "Generated by TariffDoc AI, powered by Multifactor AI."
+)
+
+# Paragraphs whose text never changes are parsed once at import. Flowables keep
+# layout state from wrap/split, so documents use shallow copies of these prototypes,
+# which also keeps concurrent builds from sharing one instance.
+_STATIC_PARAGRAPHS = {
+    text: Paragraph(text, _STYLES[style])
+    for text, style in (
+        ("TariffDoc AI", "TariffHeading1"),
+        ("Tariff Classification Summary", "TariffHeading2"),
+        ("Product Information", "TariffHeading2"),
+        ("Classification Analysis", "TariffHeading2"),
+        ("Tariff Details", "TariffHeading2"),
+        ("Trade Agreement Eligibility", "TariffHeading2"),
+        ("Expert Analysis", "TariffHeading2"),
+        ("Source Information", "TariffHeading2"),
+        (_DISCLAIMER_TEXT, "TariffSmallText"),
+    )
+}
+
+def _static_paragraph(text: str) -> Paragraph:
+    """
+    Get a fresh copy of a pre-parsed static paragraph.
+    
+    Args:
+        text: Text of the paragraph, as registered in _STATIC_PARAGRAPHS
+        
+    Returns:
+        Paragraph ready to be added to a story
+    """
+    return copy.copy(_STATIC_PARAGRAPHS[text])
+
+def _as_str_list(value: Any) -> List[str]:
+    """Normalize a list or scalar analysis field to a list of strings."""
+    return [str(item) for item in value] if isinstance(value, list) else [str(value)]
+
+# Leading number of a duty rate such as "2.5%" or "4.4¢/kg"
+_RATE_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+@functools.lru_cache(maxsize=4096)
+def _parse_rate(rate: str) -> float:
+    """
+    Parse a duty rate string into a sortable number.
+    
+    The same handful of rate strings repeat across documents, so results are cached.
+    
+    Args:
+        rate: Rate text, e.g. "Free", "2.5%" or "4.4¢/kg"
+        
+    Returns:
+        The numeric part of the rate, 0.0 for "Free", or infinity if it cannot be parsed
+    """
+    if rate.strip().lower() == "free":
+        return 0.0
+    
+    match = _RATE_NUMBER_RE.search(rate)
+    return float(match.group()) if match else float("inf")
+
+# Page geometry, in points
+_MARGIN = 0.5 * inch
+_LBL_COL = 1.5 * inch
+_VAL_COL = 5.5 * inch
+_AGREE_COLS = (2 * inch, 1 * inch, 4 * inch)
+_LOGO_HEIGHT = 0.5 * inch
+
+# Spacers only report their fixed size during layout, so shared instances are safe
+_SPACER_SMALL = Spacer(1, 0.2 * inch)
+_SPACER_TINY = Spacer(1, 0.1 * inch)
+
+# Bit flags for the optional document sections present in the tariff data
+_HAS_ANALYSIS = 1
+_HAS_AGREEMENTS = 2
+_HAS_EXPLANATION = 4
+
+def _section_flags(tariff_data: Dict[str, Any]) -> int:
+    """
+    Work out which optional sections have content to render.
+    
+    Args:
+        tariff_data: Dictionary containing tariff information
+        
+    Returns:
+        Bitmask of _HAS_* flags
+    """
+    trade_info = tariff_data.get("trade_agreements") or {}
+    return (
+        (_HAS_ANALYSIS if tariff_data.get("classification_analysis") else 0)
+        | (_HAS_AGREEMENTS if trade_info.get("eligible_agreements") else 0)
+        | (_HAS_EXPLANATION if tariff_data.get("explanation") else 0)
+    )
+
+# Maximum number of trade agreement rows per table. Longer lists are split into
+# several tables so no single flowable has to wrap and split a huge row set.
+_AGREEMENT_ROWS_PER_TABLE = 50
+
+# Table styles are immutable once built, so every table shares these instances
+# instead of rebuilding the same command lists for each section of each document.
+
+# Tabular data: bold grey header row on top
+_HEADER_ROW_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+    ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), _BOLD_FONT),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ('TOPPADDING', (0, 0), (-1, -1), 6),
+    ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+])
+
+# Document title bar with optional logo
+_TITLE_BAR_STYLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('ALIGN', (1, 0), (1, 0), 'LEFT'),
+])
+
+def _generate_worker(tariff_data: Dict[str, Any], logo_path: Optional[str], output_path: str) -> str:
+    """
+    Generate one tariff document in a worker process.
+    
+    Args:
+        tariff_data: Dictionary containing tariff information
+        logo_path: Path to the logo image file
+        output_path: Path to save the PDF file
+        
+    Returns:
+        The output path, once the PDF has been written
+    """
+    PDFGenerator(logo_path).generate_tariff_document(tariff_data, output_path)
+    return output_path
 
 class PDFGenerator:
     """Generator for tariff information PDF documents."""
@@ -24,52 +235,48 @@ class PDFGenerator:
         Args:
             logo_path: Path to the logo image file
         """
-        self.styles = getSampleStyleSheet()
+        self.styles = _STYLES
         self.logo_path = logo_path
         
-        # Create custom styles with unique names
-        self.styles.add(ParagraphStyle(
-            name='TariffHeading1',
-            parent=self.styles['Heading1'],
-            fontSize=16,
-            spaceAfter=12
-        ))
-        
-        self.styles.add(ParagraphStyle(
-            name='TariffHeading2',
-            parent=self.styles['Heading2'],
-            fontSize=14,
-            spaceAfter=10
-        ))
-        
-        self.styles.add(ParagraphStyle(
-            name='TariffNormal',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            spaceAfter=8
-        ))
-        
-        self.styles.add(ParagraphStyle(
-            name='TariffItalic',
-            parent=self.styles['Italic'],
-            fontSize=10,
-            spaceAfter=8
-        ))
-        
-        self.styles.add(ParagraphStyle(
-            name='TariffBold',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            fontName='Helvetica-Bold',
-            spaceAfter=8
-        ))
-        
-        self.styles.add(ParagraphStyle(
-            name='TariffSmallText',
-            parent=self.styles['Normal'],
-            fontSize=8,
-            spaceAfter=6
-        ))
+        # Bind the styles the section helpers use to attributes once
+        self._normal = self.styles["TariffNormal"]
+        self._italic = self.styles["TariffItalic"]
+        
+        # Read the logo once so each document decodes it from memory instead of
+        # checking and reopening the file
+        self._logo_bytes = None
+        if logo_path and os.path.exists(logo_path):
+            with open(logo_path, "rb") as logo_file:
+                self._logo_bytes = logo_file.read()
+    
+    @classmethod
+    def generate_batch(cls,
+                       items: List[Tuple[Dict[str, Any], str]],
+                       logo_path: Optional[str] = None,
+                       workers: Optional[int] = None) -> List[str]:
+        """
+        Generate many tariff documents in parallel across processes.
+        
+        ReportLab layout is CPU-bound pure Python, so separate processes are used
+        to get past the GIL. Each worker builds its own generator.
+        
+        Args:
+            items: List of (tariff_data, output_path) pairs
+            logo_path: Path to the logo image file
+            workers: Number of worker processes (defaults to the CPU count)
+            
+        Returns:
+            List of output paths, in the same order as items
+        """
+        if not items:
+            return []
+        
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            futures = [
+                executor.submit(_generate_worker, tariff_data, logo_path, output_path)
+                for tariff_data, output_path in items
+            ]
+            return [future.result() for future in futures]
     
     def generate_tariff_document(self, 
                                 tariff_data: Dict[str, Any], 
@@ -85,73 +292,123 @@ class PDFGenerator:
             File-like object containing the PDF data if output_path is None,
             otherwise returns None and saves the PDF to the specified path
         """
-        # Create a file-like object to receive PDF data
+        # Build into an in-memory buffer first, so a failed layout never leaves a
+        # truncated PDF behind at output_path
         buffer = io.BytesIO()
+        self._build_document(buffer, tariff_data)
+        
+        if output_path is None:
+            buffer.seek(0)
+            return buffer
+        
+        # Write the finished PDF to disk in one go
+        with open(output_path, "wb") as output_file:
+            output_file.write(buffer.getbuffer())
         
-        # Create the PDF document
-        doc = SimpleDocTemplate(
-            buffer if output_path is None else output_path,
+        return None
+    
+    def _build_document(self, output: BinaryIO, tariff_data: Dict[str, Any]) -> None:
+        """
+        Lay out the tariff document and write the PDF to a file-like object.
+        
+        Args:
+            output: Binary file-like object receiving the PDF data
+            tariff_data: Dictionary containing tariff information
+        """
+        # Create the PDF document with a single full-page frame
+        doc = BaseDocTemplate(
+            output,
             pagesize=letter,
-            rightMargin=0.5*inch,
-            leftMargin=0.5*inch,
-            topMargin=0.5*inch,
-            bottomMargin=0.5*inch
+            rightMargin=_MARGIN,
+            leftMargin=_MARGIN,
+            topMargin=_MARGIN,
+            bottomMargin=_MARGIN
         )
+        frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height, id="normal")
+        doc.addPageTemplates([PageTemplate(id="page", frames=[frame])])
         
         # Build the document content
         story = []
         
+        # Take a single timestamp so the generation time, last-updated date and
+        # document ID all agree
+        now = datetime.now()
+        
+        # Optional sections without content are left out entirely
+        flags = _section_flags(tariff_data)
+        
         # Add header with logo
-        self._add_header(story)
+        self._add_header(story, now)
         
         # Add product information section
         self._add_product_info(story, tariff_data)
         
         # Add classification analysis if available
-        if "classification_analysis" in tariff_data:
+        if flags & _HAS_ANALYSIS:
             self._add_classification_analysis(story, tariff_data)
         
         # Add tariff details section
         self._add_tariff_details(story, tariff_data)
         
-        # Add trade agreement section
-        self._add_trade_agreements(story, tariff_data)
+        # Add trade agreement section if any agreements apply
+        if flags & _HAS_AGREEMENTS:
+            self._add_trade_agreements(story, tariff_data)
         
         # Add explanation section if available
-        if "explanation" in tariff_data:
+        if flags & _HAS_EXPLANATION:
             self._add_explanation(story, tariff_data["explanation"])
         
         # Add source information and footer
-        self._add_source_info(story, tariff_data)
+        self._add_source_info(story, tariff_data, now)
         self._add_footer(story)
         
         # Build the PDF
         doc.build(story)
+    
+    def _text(self, text: Any, style: ParagraphStyle) -> Paragraph:
+        """
+        Build a paragraph from plain text, escaping any markup characters.
         
-        # If output_path is None, return the buffer
-        if output_path is None:
-            buffer.seek(0)
-            return buffer
+        Args:
+            text: Plain text (converted with str)
+            style: Paragraph style to apply
+            
+        Returns:
+            Paragraph rendering the text literally
+        """
+        return Paragraph(escape(str(text)), style)
+    
+    def _add_label_values(self, story: List[Any], rows: List[List[Any]]) -> None:
+        """
+        Add label/value rows as bold-labelled paragraphs.
         
-        return None
+        Fixed label/value sections do not need the cost of a Table's wrap and
+        split handling, so each row becomes one paragraph.
+        
+        Args:
+            story: Document story to append to
+            rows: List of [label, value] pairs
+        """
+        style = self._normal
+        story.extend(
+            Paragraph(f"<b>{escape(str(label))}</b> {escape(str(value))}", style)
+            for label, value in rows
+        )
+        story.append(_SPACER_TINY)
     
     def _add_classification_analysis(self, story: List[Any], tariff_data: Dict[str, Any]) -> None:
         """Add the classification analysis section."""
-        story.append(Paragraph("Classification Analysis", self.styles["TariffHeading2"]))
+        story.append(_static_paragraph("Classification Analysis"))
         
         analysis = tariff_data.get("classification_analysis", {})
         
-        # Create a table for the analysis
+        # Collect the analysis rows
         analysis_data = []
         
         # Add materials
         materials = analysis.get("materials", [])
         if materials:
-            if isinstance(materials, list):
-                materials_str = ", ".join(materials)
-            else:
-                materials_str = str(materials)
-            analysis_data.append(["Materials:", materials_str])
+            analysis_data.append(["Materials:", ", ".join(_as_str_list(materials))])
         
         # Add function
         function = analysis.get("function", "")
@@ -161,98 +418,54 @@ class PDFGenerator:
         # Add industry terms
         industry_terms = analysis.get("industry_terms", [])
         if industry_terms:
-            if isinstance(industry_terms, list):
-                terms_str = ", ".join(industry_terms)
-            else:
-                terms_str = str(industry_terms)
-            analysis_data.append(["Industry Terms:", terms_str])
+            analysis_data.append(["Industry Terms:", ", ".join(_as_str_list(industry_terms))])
         
         # Add confidence reasoning
         confidence_reason = analysis.get("confidence_reason", "")
         if confidence_reason:
             analysis_data.append(["Classification Reasoning:", confidence_reason])
         
-        # Create the table if we have data
+        # Add the rows if we have data
         if analysis_data:
-            analysis_table = Table(analysis_data, colWidths=[1.5*inch, 5.5*inch])
-            analysis_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-                ('TEXTCOLOR', (0, 0), (0, -1), colors.black),
-                ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-                ('TOPPADDING', (0, 0), (-1, -1), 6),
-                ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
-            ]))
-            
-            story.append(analysis_table)
-            story.append(Spacer(1, 0.2*inch))
+            self._add_label_values(story, analysis_data)
     
-    def _add_header(self, story: List[Any]) -> None:
+    def _add_header(self, story: List[Any], now: datetime) -> None:
         """Add the document header with logo."""
-        # Create a table for the header with logo and title
-        header_data = []
-        
-        # Add logo if available
-        if self.logo_path and os.path.exists(self.logo_path):
-            img = Image(self.logo_path, width=1.5*inch, height=0.5*inch)
-            header_data.append([img, Paragraph("TariffDoc AI", self.styles["TariffHeading1"])])
+        if self._logo_bytes:
+            # With logo, lay out logo and title side by side in a table
+            img = Image(io.BytesIO(self._logo_bytes), width=_LBL_COL, height=_LOGO_HEIGHT)
+            header_table = Table([[img, _static_paragraph("TariffDoc AI")]], colWidths=[_LBL_COL, _VAL_COL])
+            header_table.setStyle(_TITLE_BAR_STYLE)
+            story.append(header_table)
         else:
-            header_data.append([Paragraph("TariffDoc AI", self.styles["TariffHeading1"])])
+            # No logo, the title alone needs no table
+            story.append(_static_paragraph("TariffDoc AI"))
         
-        # Create the header table
-        if len(header_data[0]) == 1:
-            # No logo, use full width for title
-            header_table = Table(header_data, colWidths=[7*inch])
-        else:
-            # With logo, split width
-            header_table = Table(header_data, colWidths=[1.5*inch, 5.5*inch])
-        
-        header_table.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('ALIGN', (1, 0), (1, 0), 'LEFT'),
-        ]))
-        
-        story.append(header_table)
-        story.append(Paragraph("Tariff Classification Summary", self.styles["TariffHeading2"]))
-        story.append(Paragraph(f"Generated on: {datetime.now().strftime('%B %d, %Y at %H:%M:%S')}", self.styles["TariffItalic"]))
-        story.append(Spacer(1, 0.2*inch))
+        story.append(_static_paragraph("Tariff Classification Summary"))
+        story.append(Paragraph(f"Generated on: {now.strftime('%B %d, %Y at %H:%M:%S')}", self._italic))
+        story.append(_SPACER_SMALL)
     
     def _add_product_info(self, story: List[Any], tariff_data: Dict[str, Any]) -> None:
         """Add the product information section."""
-        story.append(Paragraph("Product Information", self.styles["TariffHeading2"]))
+        story.append(_static_paragraph("Product Information"))
         
         # Extract product information
         product_desc = tariff_data.get("product_description", "N/A")
         hts_code = tariff_data.get("hts_code", "N/A")
         hts_desc = tariff_data.get("hts_description", "N/A")
         
-        # Create a table for product information
+        # Collect product information rows
         product_data = [
             ["Product Description:", product_desc],
             ["HTS Code:", hts_code],
             ["HTS Description:", hts_desc]
         ]
         
-        product_table = Table(product_data, colWidths=[1.5*inch, 5.5*inch])
-        product_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-            ('TEXTCOLOR', (0, 0), (0, -1), colors.black),
-            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('TOPPADDING', (0, 0), (-1, -1), 6),
-            ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
-        ]))
-        
-        story.append(product_table)
-        story.append(Spacer(1, 0.2*inch))
+        self._add_label_values(story, product_data)
     
     def _add_tariff_details(self, story: List[Any], tariff_data: Dict[str, Any]) -> None:
         """Add the tariff details section."""
-        story.append(Paragraph("Tariff Details", self.styles["TariffHeading2"]))
+        story.append(_static_paragraph("Tariff Details"))
         
         # Extract tariff rates
         rates = tariff_data.get("rates", {})
@@ -261,15 +474,9 @@ class PDFGenerator:
         special_rates = rates.get("special", {})
         
         # Format special rates for display
-        special_rates_text = ""
-        if special_rates:
-            for country, rate in special_rates.items():
-                special_rates_text += f"{country}: {rate}, "
-            special_rates_text = special_rates_text.rstrip(", ")
-        else:
-            special_rates_text = "None"
+        special_rates_text = ", ".join(f"{country}: {rate}" for country, rate in special_rates.items()) if special_rates else "None"
         
-        # Create a table for tariff details
+        # Collect tariff detail rows
         tariff_details = [
             ["General Rate of Duty:", general_rate],
             ["Special Rates:", special_rates_text],
@@ -281,103 +488,66 @@ class PDFGenerator:
         if unit:
             tariff_details.append(["Unit of Quantity:", unit])
         
-        tariff_table = Table(tariff_details, colWidths=[1.5*inch, 5.5*inch])
-        tariff_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-            ('TEXTCOLOR', (0, 0), (0, -1), colors.black),
-            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('TOPPADDING', (0, 0), (-1, -1), 6),
-            ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
-        ]))
-        
-        story.append(tariff_table)
-        story.append(Spacer(1, 0.2*inch))
+        self._add_label_values(story, tariff_details)
     
     def _add_trade_agreements(self, story: List[Any], tariff_data: Dict[str, Any]) -> None:
         """Add the trade agreement section."""
-        trade_info = tariff_data.get("trade_agreements", {})
+        trade_info = tariff_data["trade_agreements"]
         
-        if not trade_info or not trade_info.get("eligible_agreements"):
-            story.append(Paragraph("Trade Agreement Eligibility", self.styles["TariffHeading2"]))
-            story.append(Paragraph("No eligible trade agreements identified for this product and country combination.", self.styles["TariffNormal"]))
-            story.append(Spacer(1, 0.2*inch))
-            return
+        story.append(_static_paragraph("Trade Agreement Eligibility"))
         
-        story.append(Paragraph("Trade Agreement Eligibility", self.styles["TariffHeading2"]))
-        
-        # Extract eligible agreements
-        eligible_agreements = trade_info.get("eligible_agreements", [])
+        # Extract eligible agreements, lowest rate first
+        eligible_agreements = sorted(
+            trade_info["eligible_agreements"],
+            key=lambda agreement: _parse_rate(str(agreement.get("rate", "")))
+        )
         
         # Create table headers
-        agreement_data = [["Agreement", "Rate", "Requirements"]]
-        
-        # Add each agreement to the table
-        for agreement in eligible_agreements:
-            agreement_data.append([
-                agreement.get("agreement", "N/A"),
-                agreement.get("rate", "N/A"),
-                agreement.get("requirements", "N/A")
-            ])
-        
-        # Create the table
-        agreement_table = Table(agreement_data, colWidths=[2*inch, 1*inch, 4*inch])
-        agreement_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('TOPPADDING', (0, 0), (-1, -1), 6),
-            ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
-        ]))
-        
-        story.append(agreement_table)
-        story.append(Spacer(1, 0.2*inch))
+        header = ["Agreement", "Rate", "Requirements"]
+        
+        # Add the agreements in fixed-size tables, each with its own header row
+        for start in range(0, len(eligible_agreements), _AGREEMENT_ROWS_PER_TABLE):
+            agreement_data = [header]
+            for agreement in eligible_agreements[start:start + _AGREEMENT_ROWS_PER_TABLE]:
+                agreement_data.append([
+                    agreement.get("agreement", "N/A"),
+                    agreement.get("rate", "N/A"),
+                    agreement.get("requirements", "N/A")
+                ])
+            
+            agreement_table = Table(agreement_data, colWidths=_AGREE_COLS, repeatRows=1)
+            agreement_table.setStyle(_HEADER_ROW_STYLE)
+            story.append(agreement_table)
+        
+        story.append(_SPACER_SMALL)
     
     def _add_explanation(self, story: List[Any], explanation: str) -> None:
         """Add the explanation section."""
-        story.append(Paragraph("Expert Analysis", self.styles["TariffHeading2"]))
-        story.append(Paragraph(explanation, self.styles["TariffNormal"]))
-        story.append(Spacer(1, 0.2*inch))
+        story.append(_static_paragraph("Expert Analysis"))
+        
+        # One paragraph per block of text keeps each flowable small, so long
+        # explanations wrap and split across pages cheaply
+        style = self._normal
+        story.extend(
+            self._text(block.strip(), style)
+            for block in str(explanation).split("\n\n")
+            if block.strip()
+        )
+        story.append(_SPACER_SMALL)
     
-    def _add_source_info(self, story: List[Any], tariff_data: Dict[str, Any]) -> None:
+    def _add_source_info(self, story: List[Any], tariff_data: Dict[str, Any], now: datetime) -> None:
         """Add the source information section."""
-        story.append(Paragraph("Source Information", self.styles["TariffHeading2"]))
+        story.append(_static_paragraph("Source Information"))
         
-        # Create a table for source information
+        # Collect source information rows
         source_data = [
             ["Data Source:", "USITC Harmonized Tariff Schedule"],
-            ["Last Updated:", datetime.now().strftime("%B %d, %Y")],
-            ["Document ID:", f"TDA-{datetime.now().strftime('%Y%m%d%H%M%S')}"]
+            ["Last Updated:", now.strftime("%B %d, %Y")],
+            ["Document ID:", now.strftime("TDA-%Y%m%d%H%M%S")]
         ]
         
-        source_table = Table(source_data, colWidths=[1.5*inch, 5.5*inch])
-        source_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-            ('TEXTCOLOR', (0, 0), (0, -1), colors.black),
-            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('TOPPADDING', (0, 0), (-1, -1), 6),
-            ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
-        ]))
-        
-        story.append(source_table)
-        story.append(Spacer(1, 0.2*inch))
+        self._add_label_values(story, source_data)
     
     def _add_footer(self, story: List[Any]) -> None:
         """Add the document footer."""
-        disclaimer = (
-            "DISCLAIMER: This document is provided for informational purposes only and does not constitute "
-            "legal advice. The information contained herein is believed to be accurate as of the date of "
-            "generation, but tariff classifications and duty rates are subject to change. Users should "
-            "consult with a licensed customs broker or trade attorney for specific guidance. "
-            "Generated by TariffDoc AI, powered by Multifactor AI."
-        )
-        
-        story.append(Paragraph(disclaimer, self.styles["TariffSmallText"]))
+        story.append(_static_paragraph(_DISCLAIMER_TEXT))
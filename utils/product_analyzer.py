@@ -5,29 +5,182 @@ This module handles the analysis of product descriptions and coordinates
 between the LLM service and the USITC API client.
 """
 
+import copy
 import json
+import logging
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any, Optional, Tuple
 from .api_client import USITCApiClient
-from .llm_service import LLMService
+from .llm_service import LLMService, ResponseCache
+
+logger = logging.getLogger(__name__)
+
+# Words ignored when extracting key words from a product description
+_COMMON_WORDS = frozenset({
+    "a", "an", "the", "and", "or", "for", "with", "without", "of", "in", "on", "at", "to", "from",
+    "by", "as", "is", "are", "was", "were", "be", "been", "being"
+})
+
+# Punctuation stripped from the ends of product description words
+_WORD_PUNCTUATION = ",.;:()[]{}\"'"
+
+# Category bonus rules, in priority order: (keyword in the product description,
+# keywords to look for in the HTS description, fragment to look for in the HTS
+# code, points). Only the first rule that matches a result counts.
+_BONUS_RULES = (
+    ("bumper", ("bumper",), "8708.10", 5),
+    ("fastener", ("fastener", "screw", "bolt"), None, 4),
+    ("plastic", ("plastic",), None, 3),
+)
+
+# Sort weight for each confidence level, highest first
+_CONF_MAP = {"High": 3, "Medium": 2, "Low": 1}
+
+class HTSResult:
+    """
+    HTS code result as it moves through the analysis pipeline.
+    
+    The fields the analyzer reads and writes are slotted attributes, which are
+    smaller and faster to access than dictionary keys in the scoring and sorting
+    loops. Any other fields from the API (rates, fallback markers, ...) are
+    carried along untouched in extra.
+    """
+    
+    __slots__ = (
+        "hts_code", "description", "description_lower", "search_terms", "relevance_score",
+        "confidence", "confidence_reason", "detailed_analysis", "extra"
+    )
+    
+    # Dictionary keys mapped onto attributes by from_dict and to_dict
+    _FIELDS = frozenset({
+        "hts_code", "description", "search_terms", "relevance_score",
+        "confidence", "confidence_reason", "detailed_analysis"
+    })
+    
+    def __init__(self,
+                 hts_code: str = "",
+                 description: str = "",
+                 search_terms: Optional[List[str]] = None,
+                 relevance_score: int = 0,
+                 confidence: Optional[str] = None,
+                 confidence_reason: Optional[str] = None,
+                 detailed_analysis: Optional[Dict[str, Any]] = None,
+                 extra: Optional[Dict[str, Any]] = None):
+        """
+        Initialize an HTS result.
+        
+        Args:
+            hts_code: HTS code
+            description: HTS description
+            search_terms: Search terms that found this code
+            relevance_score: Relevance score from the relevance filter
+            confidence: Confidence level (High, Medium or Low), if analyzed
+            confidence_reason: Reasoning behind the confidence level, if analyzed
+            detailed_analysis: Material and function match details, if analyzed
+            extra: Remaining result fields, passed through unchanged
+        """
+        self.hts_code = hts_code
+        self.description = description
+        self.description_lower = (description or "").lower()
+        self.search_terms = search_terms if search_terms is not None else []
+        self.relevance_score = relevance_score
+        self.confidence = confidence
+        self.confidence_reason = confidence_reason
+        self.detailed_analysis = detailed_analysis
+        self.extra = extra if extra is not None else {}
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HTSResult":
+        """
+        Create a result from a result dictionary.
+        
+        Args:
+            data: Result dictionary, e.g. from the API client or the LLM service
+            
+        Returns:
+            The equivalent HTSResult
+        """
+        return cls(
+            hts_code=data.get("hts_code", ""),
+            description=data.get("description", ""),
+            search_terms=list(data.get("search_terms", [])),
+            relevance_score=data.get("relevance_score", 0),
+            confidence=data.get("confidence"),
+            confidence_reason=data.get("confidence_reason"),
+            detailed_analysis=data.get("detailed_analysis"),
+            extra={key: value for key, value in data.items() if key not in cls._FIELDS}
+        )
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the result to the public result dictionary.
+        
+        Returns:
+            Dictionary with the passed-through fields plus the analyzer's fields;
+            confidence fields are only included once they have been set
+        """
+        result = dict(self.extra)
+        result["hts_code"] = self.hts_code
+        result["description"] = self.description
+        result["search_terms"] = list(self.search_terms)
+        result["relevance_score"] = self.relevance_score
+        if self.confidence is not None:
+            result["confidence"] = self.confidence
+        if self.confidence_reason is not None:
+            result["confidence_reason"] = self.confidence_reason
+        if self.detailed_analysis is not None:
+            result["detailed_analysis"] = self.detailed_analysis
+        return result
+
+def _sort_key(result: HTSResult, conf_map: Dict[str, int] = _CONF_MAP) -> Tuple[int, int, str]:
+    """
+    Sort key ordering results by relevance score, then confidence, then HTS code.
+    
+    sorted() computes the key once per result, so this is the only place the
+    results are read during a sort.
+    
+    Args:
+        result: HTS code result
+        conf_map: Confidence weights (bound as a default to skip the global lookup)
+        
+    Returns:
+        Tuple that sorts higher relevance and confidence first
+    """
+    confidence = "Medium" if result.confidence is None else result.confidence
+    return (-result.relevance_score, -conf_map.get(confidence, 0), result.hts_code)
 
 class ProductAnalyzer:
     """Analyzer for product descriptions and tariff information."""
     
-    def __init__(self, api_client: USITCApiClient, llm_service: Optional[LLMService] = None):
+    def __init__(self, 
+                 api_client: USITCApiClient, 
+                 llm_service: Optional[LLMService] = None,
+                 max_search_workers: int = 8,
+                 analysis_cache_size: int = 512,
+                 analysis_cache_ttl: int = 3600):
         """
         Initialize the product analyzer.
         
         Args:
             api_client: USITC API client
             llm_service: Optional LLM service for enhanced analysis
+            max_search_workers: Maximum number of USITC searches to run concurrently
+            analysis_cache_size: Maximum number of product analyses kept in memory
+            analysis_cache_ttl: Time-to-live for cached product analyses in seconds
         """
         self.api_client = api_client
         self.llm_service = llm_service
+        self.max_search_workers = max_search_workers
+        
+        # Repeated queries return the earlier analysis without any LLM or API calls
+        self._analysis_cache = ResponseCache(max_entries=analysis_cache_size, ttl=analysis_cache_ttl)
     
     def analyze_product(self, 
                        product_description: str, 
                        origin_country: str, 
-                       destination_country: str) -> Dict[str, Any]:
+                       destination_country: str,
+                       max_results: int = 25) -> Dict[str, Any]:
         """
         Analyze a product description and retrieve tariff information.
         
@@ -35,94 +188,147 @@ class ProductAnalyzer:
             product_description: Description of the product
             origin_country: Country of origin code
             destination_country: Destination country code
+            max_results: Maximum number of HTS results to score and return
             
         Returns:
             Dictionary with analysis results
         """
+        # Return a copy of a recent identical analysis if there is one, so callers
+        # can modify the results without touching the cached entry
+        cache_key = json.dumps([product_description, origin_country, destination_country, max_results])
+        cached = self._analysis_cache.get(cache_key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+        
+        # Check once whether the LLM can be used for this analysis
+        llm_on = self._llm_enabled()
+        
         # Step 1: Enhance the search query using LLM if available
-        search_terms = self._get_search_terms(product_description)
+        search_terms = self._get_search_terms(product_description, llm_on)
         
         # Get the product analysis if available
-        product_analysis = None
-        if self.llm_service and self.llm_service.is_enabled():
-            analysis_key = f"analysis_{product_description}"
-            if analysis_key in self.llm_service.cache:
-                product_analysis = self.llm_service.cache[analysis_key]
-        
-        # Step 2: Search for HTS codes using the enhanced terms
-        all_results = []
-        for term in search_terms:
-            results = self.api_client.search(term)
-            # Tag results with the search term that found them
+        product_analysis = self._get_cached_analysis(product_description, llm_on)
+        
+        # Step 2: Search for HTS codes using the enhanced terms. The searches are
+        # network-bound, so run them concurrently; map keeps the term order.
+        with ThreadPoolExecutor(max_workers=min(len(search_terms), self.max_search_workers)) as executor:
+            term_results = list(executor.map(self.api_client.search, search_terms))
+        
+        # Collect the results, keeping the first result for each HTS code and
+        # recording on it every search term that found that code. The API results
+        # are copied into HTSResults, so the client's cached dictionaries are not
+        # modified.
+        unique_results_by_code = {}
+        for term, results in zip(search_terms, term_results):
             for result in results:
-                if "search_terms" not in result:
-                    result["search_terms"] = []
-                result["search_terms"].append(term)
-            all_results.extend(results)
+                hts_code = result.get("hts_code", "")
+                if not hts_code:
+                    continue
+                
+                if hts_code not in unique_results_by_code:
+                    unique_results_by_code[hts_code] = HTSResult.from_dict(result)
+                unique_results_by_code[hts_code].search_terms.append(term)
         
-        # Remove duplicates based on HTS code
-        unique_results = self._deduplicate_results(all_results)
+        unique_results = list(unique_results_by_code.values())
         
-        # Filter results for relevance
-        filtered_results = self._filter_results_for_relevance(unique_results, product_description, search_terms)
+        # Filter results for relevance, keeping only the most relevant candidates so
+        # the LLM confidence analysis is spent on results that will actually be shown
+        filtered_results = self._filter_results_for_relevance(
+            unique_results, product_description, search_terms, max_results
+        )
         
         # Step 3: Analyze confidence levels using LLM if available
-        if self.llm_service and self.llm_service.is_enabled():
-            filtered_results = self.llm_service.analyze_hs_code_confidence(
-                product_description, filtered_results
+        if llm_on:
+            analyzed_results = self.llm_service.analyze_hs_code_confidence(
+                product_description, [result.to_dict() for result in filtered_results]
             )
+            filtered_results = [HTSResult.from_dict(result) for result in analyzed_results]
             
             # Enhance the confidence reasoning with material and function analysis
             if product_analysis:
+                normalized_analysis = self._normalize_analysis(product_analysis)
                 for result in filtered_results:
-                    self._enhance_confidence_reasoning(result, product_analysis, product_description)
+                    self._enhance_confidence_reasoning(result, normalized_analysis, product_description)
         
         # Step 4: Sort results by confidence (if available) or HTS code
         sorted_results = self._sort_results(filtered_results)
         
         # Return the analysis results
-        return {
+        analysis = {
             "product_description": product_description,
             "search_terms": search_terms,
             "origin_country": origin_country,
             "destination_country": destination_country,
-            "hts_results": sorted_results,
+            "hts_results": [result.to_dict() for result in sorted_results],
             "product_analysis": product_analysis
         }
+        
+        # Only cache complete analyses. A failed LLM enhancement (no product analysis
+        # was stored), sample data from the API fallback or an empty result would
+        # otherwise keep being served after the outage is over.
+        degraded = (
+            not sorted_results
+            or (llm_on and product_analysis is None)
+            or any(result.get("is_fallback") for results in term_results for result in results)
+        )
+        if not degraded:
+            self._analysis_cache.set(cache_key, copy.deepcopy(analysis))
+        
+        return analysis
+    
+    def _normalize_analysis(self, product_analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Bring a product analysis into the canonical form used for confidence reasoning.
+        
+        MATERIALS and INDUSTRY_TERMS are coerced to lists, and the lowercased match
+        forms MATERIALS_LOWER and FUNCTION_LOWER are added, once per analysis rather
+        than per result. The cached analysis itself is left unchanged.
+        
+        Args:
+            product_analysis: Product analysis from LLM
+            
+        Returns:
+            Normalized copy of the product analysis
+        """
+        normalized = dict(product_analysis)
+        
+        # Wrap scalar values so both fields are always lists
+        for key in ("MATERIALS", "INDUSTRY_TERMS"):
+            value = normalized.get(key, [])
+            normalized[key] = value if isinstance(value, list) else [value]
+        
+        function = normalized.get("FUNCTION", "")
+        normalized["FUNCTION"] = function
+        normalized["MATERIALS_LOWER"] = [str(material).lower() for material in normalized["MATERIALS"]]
+        normalized["FUNCTION_LOWER"] = function.lower() if function else ""
+        
+        return normalized
     
     def _enhance_confidence_reasoning(self, 
-                                     result: Dict[str, Any], 
-                                     product_analysis: Dict[str, Any],
+                                     result: HTSResult, 
+                                     analysis: Dict[str, Any],
                                      product_description: str) -> None:
         """
         Enhance the confidence reasoning with material and function analysis.
         
         Args:
             result: HTS result to enhance
-            product_analysis: Product analysis from LLM
+            analysis: Product analysis normalized by _normalize_analysis
             product_description: Original product description
         """
-        # Extract information from product analysis
-        materials = product_analysis.get("MATERIALS", [])
-        function = product_analysis.get("FUNCTION", "")
-        industry_terms = product_analysis.get("INDUSTRY_TERMS", [])
-        
-        # Convert to strings if they're lists
-        materials_str = ", ".join(materials) if isinstance(materials, list) else str(materials)
-        industry_terms_str = ", ".join(industry_terms) if isinstance(industry_terms, list) else str(industry_terms)
-        
         # Create enhanced reasoning
-        hts_description = result.get("description", "")
-        confidence = result.get("confidence", "Medium")
+        description_lower = result.description_lower
+        function = analysis["FUNCTION"]
         
         # Check for material matches
-        material_matches = []
-        for material in materials if isinstance(materials, list) else [materials]:
-            if material.lower() in hts_description.lower():
-                material_matches.append(material)
+        material_matches = [
+            material for material, material_lower in zip(analysis["MATERIALS"], analysis["MATERIALS_LOWER"])
+            if material_lower in description_lower
+        ]
         
         # Check for function matches
-        function_match = function.lower() in hts_description.lower() if function else False
+        function_lower = analysis["FUNCTION_LOWER"]
+        function_match = bool(function_lower) and function_lower in description_lower
         
         # Create detailed reasoning
         detailed_reasoning = []
@@ -133,23 +339,22 @@ class ProductAnalyzer:
         if function_match:
             detailed_reasoning.append(f"Function match: {function}")
         
-        if "search_terms" in result:
-            search_term = result["search_terms"][0] if result["search_terms"] else ""
-            if search_term != product_description:
-                detailed_reasoning.append(f"Found via search term: '{search_term}'")
+        search_term = result.search_terms[0] if result.search_terms else ""
+        if search_term != product_description:
+            detailed_reasoning.append(f"Found via search term: '{search_term}'")
         
         # Add original confidence reason if available
-        original_reason = result.get("confidence_reason", "")
+        original_reason = result.confidence_reason
         if original_reason and original_reason not in detailed_reasoning:
             detailed_reasoning.append(original_reason)
         
         # Update the confidence reason
         if detailed_reasoning:
-            result["confidence_reason"] = " | ".join(detailed_reasoning)
-            result["detailed_analysis"] = {
-                "materials": materials,
+            result.confidence_reason = " | ".join(detailed_reasoning)
+            result.detailed_analysis = {
+                "materials": analysis["MATERIALS"],
                 "function": function,
-                "industry_terms": industry_terms,
+                "industry_terms": analysis["INDUSTRY_TERMS"],
                 "material_matches": material_matches,
                 "function_match": function_match
             }
@@ -171,8 +376,20 @@ class ProductAnalyzer:
         Returns:
             Dictionary with all tariff information needed for document generation
         """
-        # Get HTS details
-        hts_details = self.api_client.get_hts_details(hts_code)
+        # Check once whether the LLM can be used for this document
+        llm_on = self._llm_enabled()
+        
+        # Get HTS details and trade agreement eligibility. Neither depends on the
+        # other, so both USITC requests run at the same time.
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            details_future = executor.submit(self.api_client.get_hts_details, hts_code)
+            agreements_future = executor.submit(
+                self.api_client.get_trade_agreement_eligibility,
+                hts_code, origin_country, destination_country
+            )
+            hts_details = details_future.result()
+            trade_agreements = agreements_future.result()
+        
         if not hts_details:
             # If no details found, create a minimal structure
             hts_details = {
@@ -185,14 +402,9 @@ class ProductAnalyzer:
                 }
             }
         
-        # Get trade agreement eligibility
-        trade_agreements = self.api_client.get_trade_agreement_eligibility(
-            hts_code, origin_country, destination_country
-        )
-        
         # Generate explanation using LLM if available
         explanation = ""
-        if self.llm_service and self.llm_service.is_enabled():
+        if llm_on:
             explanation = self.llm_service.generate_tariff_explanation(
                 hts_code,
                 hts_details.get("description", ""),
@@ -203,26 +415,23 @@ class ProductAnalyzer:
         
         # Get product analysis if available
         classification_analysis = None
-        if self.llm_service and self.llm_service.is_enabled():
-            analysis_key = f"analysis_{product_description}"
-            if analysis_key in self.llm_service.cache:
-                product_analysis = self.llm_service.cache[analysis_key]
-                
-                # Extract relevant information for the document
-                classification_analysis = {
-                    "materials": product_analysis.get("MATERIALS", []),
-                    "function": product_analysis.get("FUNCTION", ""),
-                    "industry_terms": product_analysis.get("INDUSTRY_TERMS", []),
-                    "hts_terminology": product_analysis.get("HTS_TERMINOLOGY", "")
-                }
-                
-                # Add confidence reasoning if available in the HTS details
-                if "confidence_reason" in hts_details:
-                    classification_analysis["confidence_reason"] = hts_details["confidence_reason"]
-                
-                # Add detailed analysis if available
-                if "detailed_analysis" in hts_details:
-                    classification_analysis.update(hts_details["detailed_analysis"])
+        product_analysis = self._get_cached_analysis(product_description, llm_on)
+        if product_analysis is not None:
+            # Extract relevant information for the document
+            classification_analysis = {
+                "materials": product_analysis.get("MATERIALS", []),
+                "function": product_analysis.get("FUNCTION", ""),
+                "industry_terms": product_analysis.get("INDUSTRY_TERMS", []),
+                "hts_terminology": product_analysis.get("HTS_TERMINOLOGY", "")
+            }
+            
+            # Add confidence reasoning if available in the HTS details
+            if "confidence_reason" in hts_details:
+                classification_analysis["confidence_reason"] = hts_details["confidence_reason"]
+            
+            # Add detailed analysis if available
+            if "detailed_analysis" in hts_details:
+                classification_analysis.update(hts_details["detailed_analysis"])
         
         # Compile all data for document generation
         document_data = {
@@ -244,17 +453,43 @@ class ProductAnalyzer:
         
         return document_data
     
-    def _get_search_terms(self, product_description: str) -> List[str]:
+    def _llm_enabled(self) -> bool:
+        """
+        Check whether an LLM service is configured and usable.
+        
+        Returns:
+            True if LLM features should be used
+        """
+        return bool(self.llm_service) and self.llm_service.is_enabled()
+    
+    def _get_cached_analysis(self, product_description: str, llm_on: bool) -> Optional[Dict[str, Any]]:
+        """
+        Get the LLM product analysis cached when the search query was enhanced.
+        
+        Args:
+            product_description: Description of the product
+            llm_on: Whether the LLM service is enabled
+            
+        Returns:
+            The product analysis, or None if the LLM is disabled or nothing is cached
+        """
+        if not llm_on:
+            return None
+        
+        return self.llm_service.get_cached_analysis(product_description)
+    
+    def _get_search_terms(self, product_description: str, llm_on: bool) -> List[str]:
         """
         Get search terms for the product description.
         
         Args:
             product_description: Original product description
+            llm_on: Whether the LLM service is enabled
             
         Returns:
             List of search terms
         """
-        if self.llm_service and self.llm_service.is_enabled():
+        if llm_on:
             # Use LLM to enhance the search query and identify appropriate HTS codes
             terms = self.llm_service.enhance_search_query(product_description)
             
@@ -262,30 +497,52 @@ class ProductAnalyzer:
             if product_description not in terms:
                 terms.append(product_description)
             
-            return terms
+            return self._dedupe_search_terms(terms, product_description)
         else:
             # Without LLM, just use the original description
             return [product_description]
     
-    def _deduplicate_results(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _dedupe_search_terms(self, terms: List[str], product_description: str) -> List[str]:
         """
-        Remove duplicate HTS code results.
+        Remove redundant search terms so each USITC query adds new coverage.
+        
+        Terms are compared case-insensitively. A term contained in a longer term is
+        dropped as well, except for the original description, which is always kept.
         
         Args:
-            results: List of HTS code results
+            terms: Search terms in priority order
+            product_description: Original product description
             
         Returns:
-            Deduplicated list of results
+            Reduced list of search terms, in the original order
         """
-        unique_results = {}
-        for result in results:
-            hts_code = result.get("hts_code", "")
-            if hts_code and hts_code not in unique_results:
-                unique_results[hts_code] = result
-        
-        return list(unique_results.values())
+        description_lower = product_description.lower()
+        
+        # Keep the first spelling of each case-insensitive term, except that any
+        # spelling of the description is replaced by the exact description
+        seen = set()
+        unique_terms = []
+        for term in terms:
+            term_lower = term.lower()
+            if term_lower not in seen:
+                seen.add(term_lower)
+                unique_terms.append(product_description if term_lower == description_lower else term)
+        
+        # Drop terms already covered by a longer term
+        return [
+            term for term in unique_terms
+            if term.lower() == description_lower
+            or not any(
+                len(other) > len(term) and term.lower() in other.lower()
+                for other in unique_terms
+            )
+        ]
     
-    def _filter_results_for_relevance(self, results: List[Dict[str, Any]], product_description: str, search_terms: List[str]) -> List[Dict[str, Any]]:
+    def _filter_results_for_relevance(self, 
+                                      results: List[HTSResult], 
+                                      product_description: str, 
+                                      search_terms: List[str],
+                                      max_results: int = 25) -> List[HTSResult]:
         """
         Filter results for relevance based on product description and search terms.
         Enhanced version with better scoring and filtering.
@@ -294,9 +551,11 @@ class ProductAnalyzer:
             results: List of HTS code results
             product_description: Original product description
             search_terms: List of search terms used
+            max_results: Maximum number of results to keep
             
         Returns:
-            Filtered list of results
+            Up to max_results of the most relevant results. If none reach the minimum
+            relevance score, the best-scoring results are returned anyway.
         """
         if not results:
             return []
@@ -306,70 +565,88 @@ class ProductAnalyzer:
         search_terms_lower = [term.lower() for term in search_terms]
         
         # Extract key words from product description (excluding common words)
-        common_words = {"a", "an", "the", "and", "or", "for", "with", "without", "of", "in", "on", "at", "to", "from", 
-                        "by", "as", "is", "are", "was", "were", "be", "been", "being"}
         product_words = set()
         for word in product_description_lower.split():
-            word = word.strip(",.;:()[]{}\"'")
-            if word and word not in common_words and len(word) > 1:
+            word = word.strip(_WORD_PUNCTUATION)
+            if len(word) > 1 and word not in _COMMON_WORDS:
                 product_words.add(word)
         
-        # Filter results
-        filtered_results = []
-        for result in results:
-            description = result.get("description", "").lower()
-            hts_code = result.get("hts_code", "").lower()
-            
-            # Skip results with HTS codes that start with "0102" (livestock)
-            if hts_code.startswith("0102"):
+        # Search terms in search order, without duplicates. Terms and words match as
+        # substrings, so "bumper" also finds "Bumpers".
+        ordered_terms = list(dict.fromkeys(term for term in search_terms_lower if term))
+        
+        # Skip results with HTS codes that start with "0102" (livestock)
+        candidates = [result for result in results if not result.hts_code.lower().startswith("0102")]
+        if not candidates:
+            return []
+        
+        # Score all candidates at once. Each rule produces an array of points laid
+        # out in parallel with the candidates, and the relevance score is their sum.
+        count = len(candidates)
+        description_array = np.array([result.description_lower for result in candidates], dtype=str)
+        code_array = np.array([result.hts_code.lower() for result in candidates], dtype=str)
+        
+        # Check if any search term is in the description, scoring the first one in
+        # search order, with extra points for exact HTS code matches
+        term_points = np.zeros(count, dtype=np.int32)
+        unmatched = np.ones(count, dtype=bool)
+        for term in ordered_terms:
+            matches = (np.char.find(description_array, term) >= 0) & unmatched
+            if not matches.any():
                 continue
-            
-            # Calculate relevance score
-            relevance_score = 0
-            
-            # Check if any search term is in the description
-            for term in search_terms_lower:
-                if term in description:
-                    relevance_score += 3
-                    # Give extra points for exact HTS code matches
-                    if term.replace('.', '').isdigit() and term in hts_code:
-                        relevance_score += 5
-                    break
-            
-            # Check if any key word from product description is in the description
-            for word in product_words:
-                if word in description:
-                    relevance_score += 1
-            
-            # Check if the result has search terms that match the product description
-            if "search_terms" in result:
-                for term in result["search_terms"]:
-                    if term.lower() == product_description_lower:
-                        relevance_score += 2
-                        break
-            
-            # Bonus points for specific product categories based on the product description
-            if "bumper" in product_description_lower and ("bumper" in description or "8708.10" in hts_code):
-                relevance_score += 5
-            elif "fastener" in product_description_lower and ("fastener" in description or "screw" in description or "bolt" in description):
-                relevance_score += 4
-            elif "plastic" in product_description_lower and "plastic" in description:
-                relevance_score += 3
-            
-            # Include result if it has a minimum relevance score
-            if relevance_score >= 1:
-                # Add relevance score to result for debugging
-                result["relevance_score"] = relevance_score
-                filtered_results.append(result)
-        
-        # If no results pass the filter, return the original results
-        if not filtered_results and results:
-            print(f"WARNING: No results passed the relevance filter. Returning original results.")
-            return results
-        
-        return filtered_results
+            term_points += 3 * matches
+            if term.replace('.', '').isdigit():
+                term_points += 5 * (matches & (np.char.find(code_array, term) >= 0))
+            unmatched &= ~matches
+        
+        # Check how many key words from product description are in the description
+        word_points = np.zeros(count, dtype=np.int32)
+        for word in product_words:
+            word_points += np.char.find(description_array, word) >= 0
+        
+        # Check if the result has search terms that match the product description
+        found_by_description = np.array(
+            [any(term.lower() == product_description_lower for term in result.search_terms) for result in candidates],
+            dtype=bool
+        )
+        
+        scores = term_points + word_points + 2 * found_by_description
+        
+        # Bonus points for specific product categories based on the product description.
+        # Which rules apply depends only on the query, so they are picked once here.
+        active_bonus = [rule for rule in _BONUS_RULES if rule[0] in product_description_lower]
+        if active_bonus:
+            # Only the first rule that matches a result counts
+            unrewarded = np.ones(count, dtype=bool)
+            for _, description_keywords, code_fragment, points in active_bonus:
+                matches = np.zeros(count, dtype=bool)
+                for keyword in description_keywords:
+                    matches |= np.char.find(description_array, keyword) >= 0
+                if code_fragment:
+                    matches |= np.char.find(code_array, code_fragment) >= 0
+                
+                rewarded = matches & unrewarded
+                scores += points * rewarded
+                unrewarded &= ~rewarded
+        
+        # Add relevance score to result for ranking and debugging
+        for result, score in zip(candidates, scores.tolist()):
+            result.relevance_score = score
+        
+        # Include results that have a minimum relevance score
+        passing = scores >= 1
+        
+        # If no results pass the filter, fall back to the best of the low-quality results
+        if not passing.any():
+            logger.warning("No results passed the relevance filter. Returning the top %d unfiltered results.",
+                           min(max_results, count))
+            passing[:] = True
+        
+        # Return the top results by score; the stable sort keeps ties in their original order
+        order = np.argsort(-scores, kind="stable")
+        return [candidates[index] for index in order[passing[order]][:max_results]]
     
-    def _sort_results(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _sort_results(self, results: List[HTSResult]) -> List[HTSResult]:
         """
         Sort results by confidence (if available) or HTS code.
         
@@ -379,46 +656,6 @@ class ProductAnalyzer:
         Returns:
             Sorted list of results
         """
-        # Check if confidence scores are available
-        has_confidence = any("confidence" in result for result in results)
-        
-        # Check if relevance scores are available
-        has_relevance = any("relevance_score" in result for result in results)
-        
-        if has_confidence and has_relevance:
-            # Define a confidence score mapping
-            confidence_map = {"High": 3, "Medium": 2, "Low": 1}
-            
-            # Sort by relevance score (high to low), then confidence (high to low), then HTS code
-            return sorted(
-                results,
-                key=lambda x: (
-                    -x.get("relevance_score", 0),
-                    -confidence_map.get(x.get("confidence", "Medium"), 0),
-                    x.get("hts_code", "")
-                )
-            )
-        elif has_confidence:
-            # Define a confidence score mapping
-            confidence_map = {"High": 3, "Medium": 2, "Low": 1}
-            
-            # Sort by confidence (high to low) and then by HTS code
-            return sorted(
-                results,
-                key=lambda x: (
-                    -confidence_map.get(x.get("confidence", "Medium"), 0),
-                    x.get("hts_code", "")
-                )
-            )
-        elif has_relevance:
-            # Sort by relevance score (high to low) and then by HTS code
-            return sorted(
-                results,
-                key=lambda x: (
-                    -x.get("relevance_score", 0),
-                    x.get("hts_code", "")
-                )
-            )
-        else:
-            # Sort by HTS code only
-            return sorted(results, key=lambda x: x.get("hts_code", ""))
+        # A missing score sorts the same for every result, so a single key covers
+        # results with or without relevance scores and confidence levels
+        return sorted(results, key=_sort_key)